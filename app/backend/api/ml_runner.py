@@ -192,27 +192,28 @@ def _ebr_points_from_config(cfg: Dict[str, Any]) -> Dict[str, int]:
 
 def calcular_ebr(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFrame:
     puntos_cfg = _ebr_points_from_config(cfg)
+    puntos_factor = [puntos_cfg.get(f.config_key, f.default_points) for f in EBR_FACTORS]
 
-    scores: List[float] = []
-    detalles: List[str] = []
+    scores = np.zeros(len(df), dtype=float)
+    detalles = np.empty(len(df), dtype=object)
 
-    for _, row in df.iterrows():
+    # Tuplas simples sólo con las columnas de los factores (faltantes = 0)
+    banderas = df.reindex(columns=[f.flag_col for f in EBR_FACTORS], fill_value=0)
+    for i, valores in enumerate(banderas.itertuples(index=False, name=None)):
         total = 0
         razones: List[str] = []
 
-        for factor in EBR_FACTORS:
-            flag_val = row.get(factor.flag_col, 0)
+        for factor, pts, flag_val in zip(EBR_FACTORS, puntos_factor, valores):
             try:
                 flag_int = int(flag_val)
             except Exception:
                 flag_int = 0
             if flag_int > 0:
-                pts = puntos_cfg.get(factor.config_key, factor.default_points)
                 total += pts
                 razones.append(f"{factor.descripcion}: +{pts}")
 
-        scores.append(float(total))
-        detalles.append("; ".join(razones) if razones else "")
+        scores[i] = float(total)
+        detalles[i] = "; ".join(razones) if razones else ""
 
     df = df.copy()
     df["score_ebr"] = scores
@@ -447,64 +448,59 @@ def aplicar_reglas_lfpiorpi(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFra
     """
     df = df.copy()
     uma_mxn = get_uma_mxn(cfg)
+    n = len(df)
+
+    # Umbrales resueltos una sola vez por fracción distinta
+    fracciones = df["fraccion"] if "fraccion" in df.columns else pd.Series([None] * n, index=df.index, dtype=object)
+    codes, unicas = pd.factorize(fracciones, use_na_sentinel=False)
+    umbrales_fr = [obtener_umbrales_fraccion(fr, cfg) for fr in unicas]
+    aviso_UMA = np.array([float(um.get("aviso_UMA", 0) or 0) for um in umbrales_fr], dtype=np.float64)[codes]
+    efectivo_max_UMA = np.array(
+        [float(um.get("efectivo_max_UMA", 0) or 0) for um in umbrales_fr], dtype=np.float64
+    )[codes]
+    fr_desc = np.array([str(um.get("descripcion", "") or "") for um in umbrales_fr], dtype=object)[codes]
+
+    monto_mxn = df["monto"].to_numpy(dtype=np.float64) if "monto" in df.columns else np.zeros(n)
+    if "monto_umas" in df.columns:
+        monto_umas = df["monto_umas"].to_numpy(dtype=np.float64)
+    else:
+        monto_umas = monto_mxn / uma_mxn
+
+    es_efectivo = df["EsEfectivo"].to_numpy() == 1 if "EsEfectivo" in df.columns else np.zeros(n, dtype=bool)
 
-    flag_aviso = []
-    flag_limite = []
-    legal_red = []
-    motivo_legal = []
-    aviso_UMA_list = []
-    efectivo_max_UMA_list = []
-    monto_umas_list = []
-    fraccion_desc_list = []
-
-    for _, row in df.iterrows():
-        fr = row.get("fraccion")
-        um = obtener_umbrales_fraccion(fr, cfg)
-        aviso_UMA = float(um.get("aviso_UMA", 0) or 0)
-        efectivo_max_UMA = float(um.get("efectivo_max_UMA", 0) or 0)
-        fr_desc = str(um.get("descripcion", "") or "")
-
-        monto_mxn = float(row.get("monto", 0.0) or 0.0)
-        monto_umas = float(row.get("monto_umas", monto_mxn / uma_mxn))
-
-        es_efectivo = int(row.get("EsEfectivo", 0) or 0) == 1
-
-        cond_aviso = aviso_UMA > 0 and monto_umas >= aviso_UMA
-        cond_limite = efectivo_max_UMA > 0 and es_efectivo and monto_umas > efectivo_max_UMA
-
-        flag_aviso.append(int(cond_aviso))
-        flag_limite.append(int(cond_limite))
-        legal_red.append(int(cond_limite))
-        aviso_UMA_list.append(aviso_UMA)
-        efectivo_max_UMA_list.append(efectivo_max_UMA)
-        monto_umas_list.append(monto_umas)
-        fraccion_desc_list.append(fr_desc)
+    cond_aviso = (aviso_UMA > 0) & (monto_umas >= aviso_UMA)
+    cond_limite = (efectivo_max_UMA > 0) & es_efectivo & (monto_umas > efectivo_max_UMA)
 
+    # El texto del motivo sólo se arma para las filas marcadas
+    motivo_legal = np.full(n, "", dtype=object)
+    fr_valores = fracciones.to_numpy()
+    for i in np.flatnonzero(cond_aviso | cond_limite):
+        fr = fr_valores[i]
         m = ""
-        if cond_aviso:
+        if cond_aviso[i]:
             m = (
-                f"Monto = {monto_mxn:,.2f} MXN (~{monto_umas:.1f} UMA) "
-                f"supera umbral de AVISO ({aviso_UMA:.1f} UMA) para la fracción {fr}."
+                f"Monto = {monto_mxn[i]:,.2f} MXN (~{monto_umas[i]:.1f} UMA) "
+                f"supera umbral de AVISO ({aviso_UMA[i]:.1f} UMA) para la fracción {fr}."
             )
-        if cond_limite:
+        if cond_limite[i]:
             if m:
                 m += " "
             m += (
                 f"Monto en EFECTIVO supera el límite legal de efectivo "
-                f"({efectivo_max_UMA:.1f} UMA) para la fracción {fr}."
+                f"({efectivo_max_UMA[i]:.1f} UMA) para la fracción {fr}."
             )
-        motivo_legal.append(m)
+        motivo_legal[i] = m
 
-    df["flag_aviso_lfpiorpi"] = flag_aviso
-    df["flag_limite_efectivo"] = flag_limite
-    df["legal_red_flag"] = legal_red
+    df["flag_aviso_lfpiorpi"] = cond_aviso.astype(int)
+    df["flag_limite_efectivo"] = cond_limite.astype(int)
+    df["legal_red_flag"] = cond_limite.astype(int)
     df["motivo_preocupante_legal"] = motivo_legal
 
     # Exponer valores UMA útiles para la explicación detallada
-    df["aviso_UMA"] = aviso_UMA_list
-    df["efectivo_max_UMA"] = efectivo_max_UMA_list
-    df["monto_umas"] = monto_umas_list
-    df["fraccion_descripcion"] = fraccion_desc_list
+    df["aviso_UMA"] = aviso_UMA
+    df["efectivo_max_UMA"] = efectivo_max_UMA
+    df["monto_umas"] = monto_umas
+    df["fraccion_descripcion"] = fr_desc
 
     df["clasificacion_legal"] = np.where(
         (df["flag_aviso_lfpiorpi"] == 1) | (df["flag_limite_efectivo"] == 1),
@@ -634,34 +630,41 @@ def fusionar_resultados(
     df = df.copy()
     thr_ebr = get_ebr_elevacion_threshold(cfg)
 
-    final = []
+    final = np.empty(len(df), dtype=object)
     elev_por_ebr = 0
     elev_por_ana = 0
     elev_por_sup = 0
 
-    for _, row in df.iterrows():
-        if row.get("clasificacion_legal") == "preocupante":
-            final.append("preocupante")
+    # Tuplas simples sólo con las columnas usadas (faltantes = None / 0)
+    cols = ["clasificacion_legal", "clasificacion_sup", "anomalía_no_sup", "score_ebr"]
+    entrada = df.reindex(columns=cols)
+    for col, defecto in (("anomalía_no_sup", 0), ("score_ebr", 0.0)):
+        if col not in df.columns:
+            entrada[col] = defecto
+
+    for i, (legal, sup, anomalia, score_ebr) in enumerate(entrada.itertuples(index=False, name=None)):
+        if legal == "preocupante":
+            final[i] = "preocupante"
             continue
 
         lab = "relevante"
 
         # modelo supervisado
-        if row.get("clasificacion_sup") == "inusual":
+        if sup == "inusual":
             lab = "inusual"
             elev_por_sup += 1
 
         # no supervisado
-        if lab == "relevante" and int(row.get("anomalía_no_sup", 0) or 0) == 1:
+        if lab == "relevante" and int(anomalia or 0) == 1:
             lab = "inusual"
             elev_por_ana += 1
 
         # EBR alto
-        if lab == "relevante" and float(row.get("score_ebr", 0.0) or 0.0) >= thr_ebr:
+        if lab == "relevante" and float(score_ebr or 0.0) >= thr_ebr:
             lab = "inusual"
             elev_por_ebr += 1
 
-        final.append(lab)
+        final[i] = lab
 
     df["clasificacion_final"] = final
     df.attrs["elev_por_sup"] = elev_por_sup
@@ -1215,6 +1218,13 @@ def procesar_df_enriquecido(
     return df, resumen
 
 
+def _leer_enriquecido(path: Path) -> pd.DataFrame:
+    """Lee el archivo enriquecido (CSV o Parquet según la extensión)."""
+    if path.suffix.lower() == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
 def run_for_file(
     input_csv: Path,
     output_csv: Path,
@@ -1223,7 +1233,7 @@ def run_for_file(
 ) -> Dict[str, Any]:
     log("=" * 70)
     log(f"📄 Procesando: {input_csv.name}")
-    df = pd.read_csv(input_csv)
+    df = _leer_enriquecido(input_csv)
     log(f"  📊 Cargado: {len(df)} filas")
 
     # modelos
@@ -1263,7 +1273,9 @@ def run_for_file(
 def _run_portal_mode(analysis_id: str, config_path: Optional[str]) -> int:
     cfg = load_config(config_path)
 
-    input_csv = PENDING_DIR / f"{analysis_id}.csv"
+    input_csv = PENDING_DIR / f"{analysis_id}.parquet"
+    if not input_csv.exists():
+        input_csv = PENDING_DIR / f"{analysis_id}.csv"
     if not input_csv.exists():
         log(f"❌ No se encontró archivo en pendiente: {input_csv}")
         return 1
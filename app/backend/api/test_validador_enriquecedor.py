@@ -0,0 +1,121 @@
+import pandas as pd
+
+from app.backend.api.utils.validador_enriquecedor import enrich_features, enriquecer_transacciones
+from app.backend.api.utils.validador_enriquecedor_new import enriquecer_transacciones as enriquecer_transacciones_new
+from app.backend.api.utils.validador_enriquecedor_v5 import enriquecer_art17
+
+
+CFG = {
+    "lfpiorpi": {
+        "uma_diaria": 113.14,
+        "umbrales": {
+            "servicios_generales": {"aviso_UMA": 0, "efectivo_max_UMA": 0, "es_actividad_vulnerable": False},
+            "VIII_vehiculos": {"aviso_UMA": 6420, "efectivo_max_UMA": 3210, "es_actividad_vulnerable": True},
+        },
+        "actividad_alto_riesgo": [],
+    }
+}
+
+
+def _df(montos):
+    return pd.DataFrame({
+        "cliente_id": ["C1"] * len(montos),
+        "monto": montos,
+        "fecha": pd.date_range("2024-01-01", periods=len(montos), freq="D"),
+        "tipo_operacion": ["efectivo"] * len(montos),
+        "sector_actividad": ["autos"] * len(montos),
+    })
+
+
+def run_test():
+    # es_monto_redondo: múltiplos aproximados de 10,000 (tolerancia < 100 MXN)
+    montos = [10000.0, 10000.0001, 9999.99, 20050.0, 20100.0, 123.45, 0.0]
+    out = enriquecer_transacciones(_df(montos), CFG).sort_values("fecha")
+    redondo = dict(zip(out["monto"], out["es_monto_redondo"]))
+    print('es_monto_redondo:', redondo)
+    assert redondo[10000.0] == 1
+    assert redondo[10000.0001] == 1, 'tiny float noise above a round amount must still count as round'
+    assert redondo[9999.99] == 0
+    assert redondo[20050.0] == 1
+    assert redondo[20100.0] == 0
+    assert redondo[123.45] == 0
+    assert redondo[0.0] == 1
+
+    # Ventana 180D: misma semántica que rolling("180D") por cliente,
+    # incluyendo fechas repetidas y el límite exacto de 180 días
+    fechas = pd.to_datetime(["2024-01-01", "2024-01-01", "2024-03-01", "2024-06-29", "2024-06-30", "2024-01-05"])
+    df = pd.DataFrame({
+        "cliente_id": ["C1", "C1", "C1", "C1", "C1", "C2"],
+        "monto": [100.0, 300.0, 50.0, 400.0, 10.0, 7.0],
+        "fecha": fechas,
+        "tipo_operacion": ["transferencia"] * 6,
+        "sector_actividad": ["autos"] * 6,
+    })
+    out = enriquecer_transacciones(df, CFG).sort_index()
+    esperado = (
+        df.set_index("fecha").groupby("cliente_id")["monto"].rolling("180D").agg(["sum", "count", "max"])
+        .reset_index(drop=True)
+    )
+    print('ventana 6m:', out[["monto_6m", "ops_6m", "monto_max_6m"]].values.tolist())
+    assert out["monto_6m"].tolist() == esperado["sum"].tolist()
+    assert out["ops_6m"].tolist() == esperado["count"].tolist()
+    assert out["monto_max_6m"].tolist() == esperado["max"].tolist()
+
+    # Ventana de un cliente que suma exactamente 500,000.00 después de otro
+    # cliente con montos grandes: la suma no debe arrastrar error de otros
+    # clientes (acumulado_alto depende de >= 500,000)
+    montos_a = [191042.96, 4627639.66, 5140037.72, 5596297.95, 9541806.33, 914307.55, 3174891.34, 4317117.63]
+    df = pd.DataFrame({
+        "cliente_id": ["A"] * len(montos_a) + ["B", "B"],
+        "monto": montos_a + [199999.99, 300000.01],
+        "fecha": list(pd.date_range("2024-01-01", periods=len(montos_a), freq="D")) + list(pd.to_datetime(["2024-03-01", "2024-03-02"])),
+        "tipo_operacion": ["transferencia"] * (len(montos_a) + 2),
+        "sector_actividad": ["autos"] * (len(montos_a) + 2),
+    })
+    out = enriquecer_transacciones(df, CFG)
+    b = out[out["cliente_id"] == "B"].sort_values("fecha")
+    print('monto_6m cliente B:', b["monto_6m"].tolist())
+    assert b["monto_6m"].iloc[-1] == 500000.0
+    assert b["acumulado_alto"].iloc[-1] == 1
+
+    # enrich_features (API pública) no debe mutar el DataFrame de entrada
+    entrada = _df([1500.0, 2500.0])
+    entrada["fecha"] = entrada["fecha"].astype(str)
+    original = entrada.copy()
+    enrich_features(entrada, CFG)
+    pd.testing.assert_frame_equal(entrada, original)
+    # concentracion_temporal (pipeline new): ops en el mes más frecuente entre
+    # TODAS las ops del cliente (las de fecha nula cuentan en el total); sin
+    # cliente_id queda NaN
+    df = pd.DataFrame({
+        "cliente_id": ["C1", "C1", "C1", "C1", None],
+        "monto": [100.0, 200.0, 300.0, 400.0, 50.0],
+        "fecha": pd.to_datetime(["2024-01-05", "2024-01-20", "2024-02-01", None, "2024-01-01"]),
+        "tipo_operacion": ["transferencia"] * 5,
+        "sector_actividad": ["autos"] * 5,
+    })
+    out = enriquecer_transacciones_new(df, CFG)
+    conc = out["concentracion_temporal"].tolist()
+    print('concentracion_temporal:', conc)
+    assert conc[:4] == [0.5] * 4
+    assert pd.isna(conc[4])
+
+    # V5: un monto exactamente en el umbral de aviso debe dar exactamente el
+    # umbral en UMAs (ml_runner compara monto_umas >= aviso_UMA)
+    cfg_v5 = {
+        "lfpiorpi": {
+            "uma_mxn": 113.14,
+            "umbrales": {"V_inmuebles": {"aviso_UMA": 16050, "efectivo_max_UMA": 8025}},
+            "actividad_alto_riesgo": [],
+        }
+    }
+    umbral_mxn = 16050 * 113.14
+    out = enriquecer_art17(_df([1815897.0, umbral_mxn]), cfg_v5, "V_inmuebles")
+    print('umbral aviso v5:', out[["monto", "monto_umas", "pct_umbral_aviso"]].values.tolist())
+    assert (out["monto_umas"] >= 16050).all(), 'amount exactly at the aviso threshold must reach it in UMAs'
+    assert (out["pct_umbral_aviso"] >= 100.0).all()
+    print('test_validador_enriquecedor OK')
+
+
+if __name__ == '__main__':
+    run_test()
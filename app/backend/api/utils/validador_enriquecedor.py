@@ -25,14 +25,23 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from datetime import datetime
 import numpy as np
 import pandas as pd
 
+# Opcional: sólo se usa para escribir Parquet
+try:
+    import pyarrow  # noqa: F401
+except Exception:
+    pyarrow = None
+
 
 # ============================================================================
 # LOGGING
@@ -121,6 +130,12 @@ SECTOR_TO_FRACCION_MAP: Dict[str, str] = {
     "crypto": "XVI_activos_virtuales",
 }
 
+# Valores (normalizados: strip + lower) de tipo_operacion que cuentan como efectivo
+TIPOS_EFECTIVO = frozenset({"efectivo", "cash", "efectivo_mn", "efectivo mn"})
+
+# Países que se consideran nacionales para EsInternacional
+PAISES_BASE = frozenset({"mx", "mexico", "méxico"})
+
 
 # ============================================================================
 # NORMALIZAR FRACCIÓN / SECTOR
@@ -253,8 +268,9 @@ def validar_campos_obligatorios(df: pd.DataFrame) -> Tuple[bool, str]:
     return True, ""
 
 
-def validar_tipos_datos(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def validar_tipos_datos(df: pd.DataFrame, *, copy: bool = True) -> pd.DataFrame:
+    if copy:
+        df = df.copy()
     # monto
     df["monto"] = pd.to_numeric(df["monto"], errors="coerce").fillna(0.0)
 
@@ -266,33 +282,67 @@ def validar_tipos_datos(df: pd.DataFrame) -> pd.DataFrame:
 # ============================================================================
 # ENRIQUECIMIENTO
 # ============================================================================
-def _rolling_6m(group: pd.DataFrame) -> pd.DataFrame:
+def _aplicar_por_valor(serie: pd.Series, fn: Any) -> pd.Series:
     """
-    Calcula métricas rolling de 6 meses por cliente:
-      - monto_6m
-      - ops_6m
-      - monto_max_6m
-      - monto_std_6m
+    Aplica `fn` una sola vez por valor distinto de `serie` (tipo categórico:
+    códigos enteros + categorías) y propaga el resultado a todas las filas.
     """
-    g = group.copy()
-    g["fecha"] = pd.to_datetime(g["fecha"], errors="coerce")
-    g["monto"] = pd.to_numeric(g["monto"], errors="coerce").fillna(0.0)
-    g = g.sort_values("fecha")
+    codes, uniques = pd.factorize(serie, use_na_sentinel=False)
+    valores = pd.Series([fn(u) for u in uniques])
+    return pd.Series(valores.to_numpy()[codes], index=serie.index)
 
-    s = pd.Series(g["monto"].values, index=g["fecha"])
-    ventana = "180D"
 
-    monto_6m = s.rolling(ventana).sum()
-    ops_6m = s.rolling(ventana).count()
-    monto_max_6m = s.rolling(ventana).max()
-    monto_std_6m = s.rolling(ventana).std().fillna(0.0)
+def _tabla_umbrales(fracciones: pd.Series, cfg: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Resuelve los umbrales (en UMA) una sola vez por fracción distinta y los
+    alinea a las filas de `fracciones`:
+      - aviso_UMA
+      - efectivo_base_UMA (efectivo_max_UMA, o aviso_UMA si no hay límite)
+    """
+    codes, uniques = pd.factorize(fracciones, use_na_sentinel=False)
+    aviso = np.zeros(len(uniques), dtype=np.float64)
+    efectivo_base = np.zeros(len(uniques), dtype=np.float64)
+    for i, fr in enumerate(uniques):
+        um = obtener_umbrales_fraccion(fr, cfg)
+        aviso[i] = float(um.get("aviso_UMA", 0) or 0)
+        efectivo_max = float(um.get("efectivo_max_UMA", 0) or 0)
+        efectivo_base[i] = efectivo_max if efectivo_max > 0 else aviso[i]
+    return pd.DataFrame(
+        {"aviso_UMA": aviso[codes], "efectivo_base_UMA": efectivo_base[codes]},
+        index=fracciones.index,
+    )
 
-    g["monto_6m"] = monto_6m.values
-    g["ops_6m"] = ops_6m.values
-    g["monto_max_6m"] = monto_max_6m.values
-    g["monto_std_6m"] = monto_std_6m.values
 
-    return g
+VENTANA_6M = "180D"
+
+
+def _rolling_6m(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula métricas rolling de 6 meses por cliente sobre `df` ya ordenado
+    por (cliente_id, fecha):
+      - monto_6m
+      - ops_6m
+      - monto_max_6m
+      - monto_std_6m
+
+    Una sola llamada agrupada de rolling de pandas, sin groupby.apply por
+    cliente.
+    """
+    codigos, _ = pd.factorize(df["cliente_id"], sort=False)
+
+    # El rolling agrupado reinicia en cada cliente: una suma acumulada global
+    # pierde centavos (la ventana sería diferencia de totales grandes) y un
+    # inf contaminaría a otros clientes.
+    ventana = (
+        pd.Series(df["monto"].to_numpy(dtype=np.float64), index=pd.DatetimeIndex(df["fecha"]))
+        .groupby(codigos, sort=False)
+        .rolling(VENTANA_6M)
+    )
+    df["monto_6m"] = ventana.sum().to_numpy()
+    df["ops_6m"] = ventana.count().to_numpy()
+    df["monto_max_6m"] = ventana.max().to_numpy()
+    df["monto_std_6m"] = ventana.std().fillna(0.0).to_numpy()
+    return df
 
 
 def enriquecer_transacciones(
@@ -322,13 +372,16 @@ def enriquecer_transacciones(
     if not valid:
         raise ValueError(err)
 
-    df = validar_tipos_datos(df)
+    # df ya es una copia propia: no duplicar de nuevo
+    df = validar_tipos_datos(df, copy=False)
 
     # 2) Año, mes, día de la semana, fin de semana
-    df["anio"] = df["fecha"].dt.year
-    df["mes"] = df["fecha"].dt.month
-    df["dia_semana"] = df["fecha"].dt.weekday
-    df["fin_de_semana"] = df["dia_semana"].isin([5, 6]).astype(int)
+    #    (un solo DatetimeIndex; sus campos se derivan del mismo arreglo int64)
+    fechas_idx = pd.DatetimeIndex(df["fecha"])
+    df["anio"] = fechas_idx.year
+    df["mes"] = fechas_idx.month
+    df["dia_semana"] = fechas_idx.weekday
+    df["fin_de_semana"] = df["dia_semana"].isin([5, 6]).astype(np.int8)
 
     # 3) fraccion / sector_actividad
     if fraccion_override:
@@ -336,9 +389,9 @@ def enriquecer_transacciones(
     else:
         if "fraccion" in df.columns:
             # usar la columna que venga, pero normalizada contra config
-            df["fraccion"] = df["fraccion"].apply(lambda x: normalizar_sector(x, cfg))
+            df["fraccion"] = _aplicar_por_valor(df["fraccion"], lambda x: normalizar_sector(x, cfg))
         elif "sector_actividad" in df.columns:
-            df["fraccion"] = df["sector_actividad"].apply(lambda x: normalizar_sector(x, cfg))
+            df["fraccion"] = _aplicar_por_valor(df["sector_actividad"], lambda x: normalizar_sector(x, cfg))
         else:
             df["fraccion"] = "servicios_generales"
 
@@ -347,103 +400,98 @@ def enriquecer_transacciones(
         df["sector_actividad"] = df["fraccion"]
 
     # 4) es_actividad_vulnerable
-    df["es_actividad_vulnerable"] = df["fraccion"].apply(lambda f: es_actividad_vulnerable(f, cfg))
+    df["es_actividad_vulnerable"] = _aplicar_por_valor(df["fraccion"], lambda f: es_actividad_vulnerable(f, cfg))
 
     # 5) EsEfectivo
     def _es_efectivo(x: Any) -> int:
         s = str(x).strip().lower()
-        return int(s in ("efectivo", "cash", "efectivo_mn", "efectivo mn"))
+        return int(s in TIPOS_EFECTIVO)
 
-    df["EsEfectivo"] = df["tipo_operacion"].apply(_es_efectivo)
+    df["EsEfectivo"] = _aplicar_por_valor(df["tipo_operacion"], _es_efectivo).astype(np.int8)
 
     # 6) EsInternacional (simple: si país origen/destino != México)
-    base_countries = {"mx", "mexico", "méxico"}
-    if "pais_origen" in df.columns or "pais_destino" in df.columns:
-
-        def _es_internacional(row: pd.Series) -> int:
-            po = str(row.get("pais_origen", "")).strip().lower()
-            pdest = str(row.get("pais_destino", "")).strip().lower()
-            if po and po not in base_countries:
-                return 1
-            if pdest and pdest not in base_countries:
-                return 1
-            return 0
-
-        df["EsInternacional"] = df.apply(_es_internacional, axis=1)
-    else:
-        df["EsInternacional"] = 0
+    #    Se evalúa por columna y por país distinto, sin recorrer filas en Python.
+    def _es_extranjero(pais: Any) -> bool:
+        p = str(pais).strip().lower()
+        return bool(p) and p not in PAISES_BASE
+
+    internacional = np.zeros(len(df), dtype=bool)
+    for col in ("pais_origen", "pais_destino"):
+        if col in df.columns:
+            internacional |= _aplicar_por_valor(df[col], _es_extranjero).to_numpy(dtype=bool)
+    df["EsInternacional"] = internacional.astype(np.int8)
 
-    # 7) SectorAltoRiesgo (según config)
-    alto = set(cfg.get("lfpiorpi", {}).get("actividad_alto_riesgo", []))
-    df["SectorAltoRiesgo"] = df["fraccion"].isin(alto).astype(int)
+    # 7) SectorAltoRiesgo (según config), sobre los códigos de fracción
+    alto = frozenset(cfg.get("lfpiorpi", {}).get("actividad_alto_riesgo", []))
+    df["SectorAltoRiesgo"] = _aplicar_por_valor(df["fraccion"], alto.__contains__).astype(np.int8)
 
     # 8) monto_umas
     uma = get_uma_mxn(cfg)
-    df["monto_umas"] = (df["monto"] / uma).replace([np.inf, -np.inf], 0).round(2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        monto_umas = df["monto"].to_numpy(dtype=np.float64) / uma
+    monto_umas[np.isinf(monto_umas)] = 0.0
+    df["monto_umas"] = np.round(monto_umas, 2)
 
     # 9) Rolling 6m por cliente
-    df = df.sort_values(["cliente_id", "fecha"])
-    df = df.groupby("cliente_id", group_keys=False).apply(_rolling_6m)
+    df = df.sort_values(["cliente_id", "fecha"], kind="mergesort")
+    df = df[df["cliente_id"].notna()]
+    df = _rolling_6m(df)
 
     # Promedios y ratio_vs_promedio
+    #     Sobre arrays numpy en sitio: evita las copias de replace()/fillna().
     df["ops_6m"] = df["ops_6m"].fillna(1)
     df["monto_6m"] = df["monto_6m"].fillna(df["monto"])
-    df["monto_promedio_cliente"] = (df["monto_6m"] / df["ops_6m"]).replace(0, np.nan)
-    df["monto_promedio_cliente"] = df["monto_promedio_cliente"].fillna(df["monto"])
-    df["ratio_vs_promedio"] = (
-        df["monto"] / df["monto_promedio_cliente"].replace(0, 1)
-    ).replace([np.inf, -np.inf], 1).round(2)
+    monto = df["monto"].to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        promedio = df["monto_6m"].to_numpy(dtype=np.float64) / df["ops_6m"].to_numpy(dtype=np.float64)
+        sin_promedio = np.isnan(promedio) | (promedio == 0)
+        promedio[sin_promedio] = monto[sin_promedio]
+        ratio = monto / np.where(promedio == 0, 1.0, promedio)
+    ratio[np.isinf(ratio)] = 1.0
+    df["monto_promedio_cliente"] = promedio
+    df["ratio_vs_promedio"] = np.round(ratio, 2)
 
     # 10) pct_umbral_aviso (monto vs aviso_UMA, en %)
-    def _pct_umbral(row: pd.Series) -> float:
-        um = obtener_umbrales_fraccion(row.get("fraccion"), cfg)
-        aviso_UMA = float(um.get("aviso_UMA", 0) or 0)
-        if aviso_UMA <= 0:
-            return 0.0
-        umbral_mxn = aviso_UMA * uma
-        if umbral_mxn <= 0:
-            return 0.0
-        return round((row["monto"] / umbral_mxn) * 100.0, 2)
-
-    df["pct_umbral_aviso"] = df.apply(_pct_umbral, axis=1)
+    #     Umbrales resueltos una vez por fracción; el resto es aritmética vectorial.
+    umbrales = _tabla_umbrales(df["fraccion"], cfg)
+    umbral_mxn = umbrales["aviso_UMA"].to_numpy() * uma
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(umbral_mxn > 0, monto / umbral_mxn * 100.0, 0.0)
+    df["pct_umbral_aviso"] = np.round(pct, 2)
 
     # 11) es_nocturno
     if "hora" in df.columns:
         hora = pd.to_numeric(df["hora"], errors="coerce").fillna(12)
     else:
         hora = pd.Series(12, index=df.index)
-    df["es_nocturno"] = ((hora >= 22) | (hora <= 5)).astype(int)
+    df["es_nocturno"] = ((hora >= 22) | (hora <= 5)).astype(np.int8)
 
     # 12) es_monto_redondo (aprox múltiplos de 10,000)
-    df["es_monto_redondo"] = ((df["monto"] % 10000).abs() < 100).astype(int)
+    #     Se evalúa en centavos enteros: evita fmod en float y errores de redondeo.
+    centavos = np.rint(df["monto"].to_numpy(dtype=np.float64) * 100).astype(np.int64)
+    df["es_monto_redondo"] = ((centavos % 1_000_000) < 10_000).astype(np.int8)
 
     # 13) posible_burst (≥3 ops mismo cliente mismo día)
-    df["fecha_sola"] = df["fecha"].dt.date
+    df["fecha_sola"] = df["fecha"].dt.normalize()
     counts = df.groupby(["cliente_id", "fecha_sola"])["monto"].transform("count")
-    df["posible_burst"] = (counts >= 3).astype(int)
+    df["posible_burst"] = (counts >= 3).astype(np.int8)
     df.drop(columns=["fecha_sola"], inplace=True)
 
     # 14) acumulado_alto (monto_6m > ~500,000 MXN)
-    df["acumulado_alto"] = (df["monto_6m"] >= 500_000).astype(int)
+    df["acumulado_alto"] = (df["monto_6m"] >= 500_000).astype(np.int8)
 
     # 15) efectivo_alto (efectivo >= 75% del umbral permitido)
-    def _efectivo_alto(row: pd.Series) -> int:
-        if row.get("EsEfectivo", 0) != 1:
-            return 0
-        um = obtener_umbrales_fraccion(row.get("fraccion"), cfg)
-        aviso_UMA = float(um.get("aviso_UMA", 0) or 0)
-        efectivo_max_UMA = float(um.get("efectivo_max_UMA", 0) or 0)
-        base_UMA = efectivo_max_UMA if efectivo_max_UMA > 0 else aviso_UMA
-        if base_UMA <= 0:
-            return 0
-        return int(row.get("monto_umas", 0) >= 0.75 * base_UMA)
-
-    df["efectivo_alto"] = df.apply(_efectivo_alto, axis=1)
+    base_UMA = umbrales["efectivo_base_UMA"].to_numpy()
+    df["efectivo_alto"] = (
+        (df["EsEfectivo"].to_numpy() == 1)
+        & (base_UMA > 0)
+        & (df["monto_umas"].to_numpy() >= 0.75 * base_UMA)
+    ).astype(np.int8)
 
     # 16) frecuencia_mensual, ratio_alto, frecuencia_alta
     df["frecuencia_mensual"] = (df["ops_6m"] / 6.0).round().astype(int).clip(lower=1)
-    df["ratio_alto"] = (df["ratio_vs_promedio"] > 3).astype(int)
-    df["frecuencia_alta"] = (df["ops_6m"] > 5).astype(int)
+    df["ratio_alto"] = (df["ratio_vs_promedio"] > 3).astype(np.int8)
+    df["frecuencia_alta"] = (df["ops_6m"] > 5).astype(np.int8)
 
     return df
 
@@ -474,6 +522,7 @@ def procesar_archivo(
     tipo_usuario: str = "actividad_vulnerable",
     fraccion: Optional[str] = None,
     return_path_only: bool = False,
+    output_format: str = "csv",
     **kwargs: Any,
 ) -> Tuple[bool, str, Optional[pd.DataFrame]] | str:
     """
@@ -481,6 +530,9 @@ def procesar_archivo(
     Compatible con:
       - llamada directa desde CLI
       - llamada desde enhanced_main_api (portal/API)
+
+    output_format="parquet" escribe Parquet (zstd) con el mismo nombre base;
+    ml_runner lo lee directamente.
     """
     try:
         if input_csv and not input_path:
@@ -540,7 +592,15 @@ def procesar_archivo(
             output_path = Path(output_path)
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        df_enriched.to_csv(output_path, index=False, encoding="utf-8")
+        if output_format == "parquet" and pyarrow is None:
+            log("  ⚠️ pyarrow no está instalado; se guarda en CSV")
+            output_format = "csv"
+
+        if output_format == "parquet":
+            output_path = Path(output_path).with_suffix(".parquet")
+            df_enriched.to_parquet(output_path, engine="pyarrow", compression="zstd", index=False)
+        else:
+            df_enriched.to_csv(output_path, index=False, encoding="utf-8")
         log(f"  ✅ Guardado: {output_path}")
         log("=" * 70)
 
@@ -560,6 +620,35 @@ def procesar_archivo(
         return False, str(e), None
 
 
+def procesar_varios_archivos(
+    input_paths: Sequence[str],
+    sector_actividad: Optional[str] = None,
+    config_path: Optional[str] = None,
+    n_jobs: Optional[int] = None,
+    output_format: str = "csv",
+) -> List[str]:
+    """
+    Procesa varios archivos independientes en paralelo (un proceso por
+    archivo, hasta n_jobs; por defecto os.cpu_count()).
+
+    Devuelve la ruta enriquecida de cada entrada en el mismo orden ("" si
+    falló). Cada worker carga el config una sola vez gracias a _CONFIG_CACHE.
+    """
+    procesar = partial(
+        procesar_archivo,
+        sector_actividad=sector_actividad,
+        config_path=config_path,
+        return_path_only=True,
+        output_format=output_format,
+    )
+    paths = [str(p) for p in input_paths]
+    max_workers = min(n_jobs or os.cpu_count() or 1, len(paths))
+    if max_workers <= 1:
+        return [procesar(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=max_workers) as ex:
+        return list(ex.map(procesar, paths))
+
+
 # ============================================================================
 # CLI
 # ============================================================================
@@ -593,6 +682,12 @@ def main() -> int:
         required=False,
         help="Fracción LFPIORPI (ej. VIII_vehiculos). Si se omite, se intentará usar sector_actividad del archivo.",
     )
+    parser.add_argument(
+        "--output_format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="Formato del archivo enriquecido (parquet es más rápido de escribir/leer)",
+    )
 
     args = parser.parse_args()
 
@@ -602,6 +697,7 @@ def main() -> int:
         config_path=args.config,
         tipo_usuario=args.tipo_usuario,
         fraccion=args.fraccion,
+        output_format=args.output_format,
     )
 
     if ok:
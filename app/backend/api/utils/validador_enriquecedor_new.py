@@ -22,14 +22,22 @@ Uso:
 """
 
 import os
+import re
 import sys
 import json
 import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, Dict, Any, Tuple, List
 
+# Opcional: lector CSV multihilo y Parquet de Arrow
+try:
+    import pyarrow as pa
+except Exception:
+    pa = None
+
 # ============================================================================
 # LOGGING
 # ============================================================================
@@ -44,8 +52,9 @@ def log(msg: str):
 _CONFIG_CACHE: Dict[str, Any] = {}
 
 
+@lru_cache(maxsize=1)
 def _find_config_path() -> Path:
-    """Busca config_modelos.json"""
+    """Busca config_modelos.json (la ruta encontrada se memoiza por proceso)"""
     here = Path(__file__).resolve().parent
     candidates = [
         here.parent / "models" / "config_modelos.json",
@@ -80,6 +89,25 @@ def get_uma_mxn(cfg: Dict[str, Any]) -> float:
     return float(lfpi.get("uma_diaria", lfpi.get("uma_mxn", 113.14)))
 
 
+def umbrales_mxn_por_fila(fraccion: pd.Series, cfg: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Umbrales (efectivo, aviso) en MXN para cada fila según su fracción.
+    
+    La tabla se resuelve una sola vez por fracción distinta y se expande
+    con los códigos de factorize.
+    """
+    umbrales = cfg.get("lfpiorpi", {}).get("umbrales", {})
+    uma = get_uma_mxn(cfg)
+    codes, fracciones = pd.factorize(fraccion, use_na_sentinel=False)
+    efectivo = np.empty(len(fracciones), dtype=np.float64)
+    aviso = np.empty(len(fracciones), dtype=np.float64)
+    for i, f in enumerate(fracciones):
+        u = umbrales.get(f, umbrales.get("_general", {}))
+        efectivo[i] = float(u.get("efectivo_max_UMA", u.get("aviso_UMA", 645))) * uma
+        aviso[i] = float(u.get("aviso_UMA", 645)) * uma
+    return efectivo[codes], aviso[codes]
+
+
 # ============================================================================
 # MAPEO SECTOR → FRACCIÓN LFPIORPI
 # ============================================================================
@@ -301,6 +329,14 @@ SECTOR_TO_FRACCION_MAP = {
 }
 
 
+# Tabla de traducción para quitar acentos (se construye una sola vez)
+_SIN_ACENTOS = str.maketrans("áéíóúüñ", "aeiouun")
+
+# Patrones de tipo_operacion (compilados una vez, aplicados por valor distinto)
+_RE_EFECTIVO = re.compile(r"efectivo|cash|efvo")
+_RE_INTERNACIONAL = re.compile(r"internacional|inter|foreign|ext")
+
+
 def normalizar_sector(sector_raw: Any) -> str:
     """
     Normaliza sector de actividad a fracción LFPIORPI.
@@ -312,14 +348,17 @@ def normalizar_sector(sector_raw: Any) -> str:
     """
     if pd.isna(sector_raw) or sector_raw is None:
         return "servicios_generales"
-    
+    return _normalizar_sector_texto(str(sector_raw))
+
+
+@lru_cache(maxsize=4096)
+def _normalizar_sector_texto(sector_raw: str) -> str:
+    """normalizar_sector para texto ya validado; memoizado por valor crudo."""
     # Limpiar
-    sector_clean = str(sector_raw).lower().strip()
+    sector_clean = sector_raw.lower().strip()
     
     # Quitar acentos
-    acentos = {'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u', 'ü': 'u', 'ñ': 'n'}
-    for a, s in acentos.items():
-        sector_clean = sector_clean.replace(a, s)
+    sector_clean = sector_clean.translate(_SIN_ACENTOS)
     
     if not sector_clean or sector_clean in ("nan", "none", "null", ""):
         return "servicios_generales"
@@ -342,19 +381,52 @@ def normalizar_sector(sector_raw: Any) -> str:
     return "servicios_generales"
 
 
+def normalizar_sector_series(sectores: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada de normalizar_sector para una columna completa.
+    
+    Limpieza y matches exactos (tal cual y con underscores) con operaciones
+    de pandas; sólo los valores distintos que no resuelven así pasan por
+    normalizar_sector (nulos y match parcial).
+    """
+    limpio = sectores.astype("string").str.lower().str.strip().str.translate(_SIN_ACENTOS)
+    fraccion = limpio.map(SECTOR_TO_FRACCION_MAP).astype(object)
+    
+    pendientes = fraccion.isna().to_numpy()
+    if pendientes.any():
+        con_underscore = limpio[pendientes].str.replace(r"[ -]", "_", regex=True)
+        fraccion[pendientes] = con_underscore.map(SECTOR_TO_FRACCION_MAP).astype(object)
+        pendientes = fraccion.isna().to_numpy()
+    
+    if pendientes.any():
+        codes, uniques = pd.factorize(sectores[pendientes], use_na_sentinel=False)
+        resueltos = np.array([normalizar_sector(u) for u in uniques], dtype=object)
+        fraccion[pendientes] = resueltos[codes]
+    return fraccion
+
+
+NO_VULNERABLES = frozenset({
+    "servicios_generales", "_general", "_no_vulnerable",
+    "otro", "servicios", "comercio"
+})
+
+
 def es_actividad_vulnerable(fraccion: str) -> bool:
     """
     Determina si una fracción es actividad vulnerable bajo LFPIORPI.
     
     servicios_generales → NO es vulnerable → pasa libre al ML
     """
-    NO_VULNERABLES = [
-        "servicios_generales", "_general", "_no_vulnerable",
-        "otro", "servicios", "comercio"
-    ]
     return fraccion not in NO_VULNERABLES and not fraccion.startswith("_")
 
 
+# Fracciones vulnerables precalculadas: normalizar_sector solo devuelve valores
+# del mapa (o servicios_generales), así que basta un isin sobre este conjunto
+VULN_FRACCIONES = frozenset(
+    f for f in SECTOR_TO_FRACCION_MAP.values() if es_actividad_vulnerable(f)
+)
+
+
 # ============================================================================
 # VALIDACIÓN
 # ============================================================================
@@ -373,7 +445,7 @@ def validar_campos_obligatorios(df: pd.DataFrame, cfg: Dict[str, Any]) -> Tuple[
 
 def validar_tipos_datos(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
     """Valida y convierte tipos de datos"""
-    df = df.copy()
+    df = df.copy(deep=False)  # solo se reasignan columnas completas
     warnings = []
     
     # Monto: debe ser numérico
@@ -402,16 +474,15 @@ def enriquecer_transacciones(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFr
     
     Features generadas:
     - fraccion: Fracción LFPIORPI normalizada
-    - es_actividad_vulnerable: bool
+    - es_actividad_vulnerable: int (0/1)
     - EsEfectivo, EsInternacional, SectorAltoRiesgo
     - monto_6m, ops_6m (acumulados por cliente)
     - ratio_vs_promedio, efectivo_alto, acumulado_alto
     - es_nocturno, fin_de_semana, es_monto_redondo, posible_burst
     """
-    df = df.copy()
+    df = df.copy(deep=False)  # solo se reasignan columnas completas
     uma = get_uma_mxn(cfg)
     lfpi = cfg.get("lfpiorpi", {})
-    umbrales = lfpi.get("umbrales", {})
     alto_riesgo_list = lfpi.get("actividad_alto_riesgo", [])
     
     # ================================================================
@@ -424,10 +495,10 @@ def enriquecer_transacciones(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFr
     if "sector_actividad" not in df.columns:
         df["sector_actividad"] = "servicios_generales"
     
-    df["fraccion"] = df["sector_actividad"].apply(normalizar_sector)
+    df["fraccion"] = normalizar_sector_series(df["sector_actividad"])
     # Preserve input es_actividad_vulnerable if provided, otherwise derive from fraccion/config
     if "es_actividad_vulnerable" not in df.columns:
-        df["es_actividad_vulnerable"] = df["fraccion"].apply(es_actividad_vulnerable)
+        df["es_actividad_vulnerable"] = df["fraccion"].isin(VULN_FRACCIONES).astype(np.int8)
     else:
         # Normalize if it's string/boolean
         df["es_actividad_vulnerable"] = df["es_actividad_vulnerable"].apply(lambda x: 1 if str(x).lower() in ("1","true","yes","si","sí") else 0)
@@ -439,9 +510,9 @@ def enriquecer_transacciones(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFr
     # 2. Flags de tipo de operación
     # ================================================================
     if "tipo_operacion" in df.columns:
-        tipo_lower = df["tipo_operacion"].str.lower().fillna("")
-        df["EsEfectivo"] = tipo_lower.str.contains("efectivo|cash|efvo", regex=True).astype(int)
-        df["EsInternacional"] = tipo_lower.str.contains("internacional|inter|foreign|ext", regex=True).astype(int)
+        codes, tipos = pd.factorize(df["tipo_operacion"].str.lower().fillna(""))
+        df["EsEfectivo"] = np.array([_RE_EFECTIVO.search(t) is not None for t in tipos], dtype=np.int8)[codes]
+        df["EsInternacional"] = np.array([_RE_INTERNACIONAL.search(t) is not None for t in tipos], dtype=np.int8)[codes]
     else:
         df["EsEfectivo"] = 0
         df["EsInternacional"] = 0
@@ -449,14 +520,14 @@ def enriquecer_transacciones(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFr
     # ================================================================
     # 3. Sector alto riesgo
     # ================================================================
-    df["SectorAltoRiesgo"] = df["fraccion"].isin(alto_riesgo_list).astype(int)
+    df["SectorAltoRiesgo"] = df["fraccion"].isin(alto_riesgo_list).astype(np.int8)
     
     # ================================================================
     # 4. Acumulados por cliente (últimos 6 months simulated)
     # ================================================================
     if "cliente_id" in df.columns and "monto" in df.columns:
         # Agrupar por cliente
-        cliente_stats = df.groupby("cliente_id").agg({
+        cliente_stats = df.groupby("cliente_id", sort=False).agg({
             "monto": ["sum", "mean", "count"]
         }).reset_index()
         cliente_stats.columns = ["cliente_id", "monto_total", "monto_promedio", "num_ops"]
@@ -472,35 +543,45 @@ def enriquecer_transacciones(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFr
         df["monto_std_6m"] = 0.0
         
         # Ratio vs promedio
-        df["ratio_vs_promedio"] = (df["monto"] / df["monto_promedio_cliente"].replace(0, 1)).round(2)
+        monto_np = df["monto"].to_numpy(dtype=np.float64)
+        promedio_np = df["monto_promedio_cliente"].to_numpy(dtype=np.float64)
+        df["ratio_vs_promedio"] = np.round(monto_np / np.where(promedio_np == 0, 1.0, promedio_np), 2)
         
-        # Calculate windowed stats per cliente (last 180 days window)
-        from datetime import timedelta
-        df = df.sort_values(["cliente_id", "fecha"]).reset_index(drop=True)
-        for cliente_id in df["cliente_id"].unique():
-            mask_cliente = df["cliente_id"] == cliente_id
-            ventana_idx = df[mask_cliente].index
-            for idx in ventana_idx:
-                fecha_actual = df.loc[idx, "fecha"]
-                if pd.isna(fecha_actual):
-                    df.loc[idx, "monto_6m"] = df.loc[idx, "monto"]
-                    df.loc[idx, "ops_6m"] = 1
-                    df.loc[idx, "monto_max_6m"] = df.loc[idx, "monto"]
-                    df.loc[idx, "monto_std_6m"] = 0.0
-                    continue
-                fecha_inicio = fecha_actual - timedelta(days=180)
-                mask_ventana = (df["cliente_id"] == cliente_id) & (df["fecha"] >= fecha_inicio) & (df["fecha"] <= fecha_actual)
-                ventana_df = df[mask_ventana]
-                if len(ventana_df) > 0:
-                    df.loc[idx, "monto_6m"] = ventana_df["monto"].sum()
-                    df.loc[idx, "ops_6m"] = len(ventana_df)
-                    df.loc[idx, "monto_max_6m"] = ventana_df["monto"].max()
-                    df.loc[idx, "monto_std_6m"] = ventana_df["monto"].std() if len(ventana_df) > 1 else 0.0
-                else:
-                    df.loc[idx, "monto_6m"] = df.loc[idx, "monto"]
-                    df.loc[idx, "ops_6m"] = 1
-                    df.loc[idx, "monto_max_6m"] = df.loc[idx, "monto"]
-                    df.loc[idx, "monto_std_6m"] = 0.0
+        # Calculate windowed stats per cliente (last 180 days window):
+        # un solo groupby().rolling("180D", closed="both") en Cython.
+        # Único ordenamiento del pipeline; los groupby usan sort=False
+        df = df.sort_values(["cliente_id", "fecha"], kind="stable").reset_index(drop=True)
+        rolling_cols = ["monto_6m", "ops_6m", "monto_max_6m", "monto_std_6m"]
+        
+        # Sin fecha: la ventana es sólo la propia operación
+        sin_fecha = df["fecha"].isna() & df["cliente_id"].notna()
+        df.loc[sin_fecha, "monto_6m"] = df.loc[sin_fecha, "monto"]
+        df.loc[sin_fecha, "ops_6m"] = 1
+        df.loc[sin_fecha, "monto_max_6m"] = df.loc[sin_fecha, "monto"]
+        df.loc[sin_fecha, "monto_std_6m"] = 0.0
+        
+        validas = df["fecha"].notna() & df["cliente_id"].notna()
+        if validas.any():
+            base = df.loc[validas, ["cliente_id", "fecha", "monto"]]
+            base["_op"] = 1.0
+            ventana = base.groupby("cliente_id", sort=False).rolling("180D", on="fecha", closed="both")
+            # base está ordenado por cliente: el resultado sale en el mismo orden
+            ops = ventana["_op"].sum().to_numpy()
+            stats = np.column_stack([
+                np.nan_to_num(ventana["monto"].sum().to_numpy(), nan=0.0),
+                ops,
+                ventana["monto"].max().to_numpy(),
+                np.where(ops > 1, ventana["monto"].std().to_numpy(), 0.0),
+            ])
+            
+            # Operaciones con la misma fecha comparten la ventana completa:
+            # todas toman la fila de la última por posición (no "last", que
+            # salta NaN); cada par cliente/fecha es contiguo en base
+            claves = base[["cliente_id", "fecha"]]
+            ultima = np.flatnonzero(~claves.duplicated(keep="last").to_numpy())
+            grupo = np.cumsum(~claves.duplicated(keep="first").to_numpy()) - 1
+            df.loc[validas, rolling_cols] = stats[ultima[grupo]]
+        df["ops_6m"] = df["ops_6m"].astype(np.int32)
 
         # Limpiar columnas temporales
         df = df.drop(columns=["monto_total", "monto_promedio", "num_ops"], errors="ignore")
@@ -514,36 +595,27 @@ def enriquecer_transacciones(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFr
     # ================================================================
     # 5. Efectivo alto (>=75% del umbral)
     # ================================================================
-    def calcular_efectivo_alto(row):
-        if row.get("EsEfectivo") != 1:
-            return 0
-        fraccion = row.get("fraccion", "servicios_generales")
-        monto = float(row.get("monto", 0) or 0)
-        
-        # Obtener umbral de efectivo de la fracción
-        u = umbrales.get(fraccion, umbrales.get("_general", {}))
-        umbral_ef_umas = float(u.get("efectivo_max_UMA", u.get("aviso_UMA", 645)))
-        umbral_ef_mxn = umbral_ef_umas * uma
-        
-        if umbral_ef_mxn > 0 and monto >= 0.75 * umbral_ef_mxn:
-            return 1
-        return 0
-    
-    df["efectivo_alto"] = df.apply(calcular_efectivo_alto, axis=1)
+    # Umbrales en MXN por fila; se reutilizan en pct_umbral_aviso
+    umbral_ef_mxn, umbral_av_mxn = umbrales_mxn_por_fila(df["fraccion"], cfg)
+    monto_np = df["monto"].to_numpy(dtype=np.float64)
+    es_efectivo = df["EsEfectivo"].to_numpy() == 1 if "EsEfectivo" in df.columns else False
+    df["efectivo_alto"] = (
+        es_efectivo & (umbral_ef_mxn > 0) & (monto_np >= 0.75 * umbral_ef_mxn)
+    ).astype(np.int8)
     
     # ================================================================
     # 6. Acumulado alto (monto_6m >= 500k o >= umbral)
     # ================================================================
-    df["acumulado_alto"] = (df["monto_6m"] >= 500000).astype(int)
+    df["acumulado_alto"] = (df["monto_6m"] >= 500000).astype(np.int8)
     
     # ================================================================
     # 7. Features temporales
     # ================================================================
-    if "fecha" in df.columns and df["fecha"].dtype == "datetime64[ns]":
+    if "fecha" in df.columns and pd.api.types.is_datetime64_any_dtype(df["fecha"]):
         df["dia_semana"] = df["fecha"].dt.dayofweek
         df["mes"] = df["fecha"].dt.month
-        df["fin_de_semana"] = (df["dia_semana"] >= 5).astype(int)
-        df["quincena"] = (df["fecha"].dt.day > 15).astype(int)
+        df["fin_de_semana"] = (df["dia_semana"] >= 5).astype(np.int8)
+        df["quincena"] = (df["fecha"].dt.day > 15).astype(np.int8)
     else:
         df["dia_semana"] = 0
         df["mes"] = 1
@@ -551,8 +623,12 @@ def enriquecer_transacciones(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFr
         df["quincena"] = 0
     
     if "hora" in df.columns:
-        hora = pd.to_numeric(df["hora"], errors="coerce").fillna(12)
-        df["es_nocturno"] = ((hora >= 22) | (hora <= 5)).astype(int)
+        # Hora ya entera de NumPy (caso típico, sin nulos): se compara directo
+        if df["hora"].dtype.kind in "iu" and isinstance(df["hora"].dtype, np.dtype):
+            hora = df["hora"].to_numpy()
+        else:
+            hora = pd.to_numeric(df["hora"], errors="coerce").fillna(12).to_numpy()
+        df["es_nocturno"] = ((hora >= 22) | (hora <= 5)).astype(np.int8)
     else:
         df["es_nocturno"] = 0
     
@@ -560,7 +636,11 @@ def enriquecer_transacciones(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFr
     # 8. Monto redondo
     # ================================================================
     if "monto" in df.columns:
-        df["es_monto_redondo"] = ((df["monto"] % 10000) < 100).astype(int)
+        # En centavos enteros (int64): módulo entero en vez de fmod en float
+        monto_f = df["monto"].to_numpy(dtype=np.float64)
+        finito = np.isfinite(monto_f)
+        centavos = np.rint(np.where(finito, monto_f, 0.0) * 100).astype(np.int64)
+        df["es_monto_redondo"] = (finito & (centavos % 1_000_000 < 10_000)).astype(np.int8)
     else:
         df["es_monto_redondo"] = 0
     
@@ -570,8 +650,43 @@ def enriquecer_transacciones(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFr
     # 10. Rolling & advanced features: ops_relativas, diversidad, concentracion
     total_ops = len(df)
     df["ops_relativas"] = (df["ops_6m"] / total_ops) if total_ops > 0 else 0
-    df["diversidad_operaciones"] = df.groupby("cliente_id")["tipo_operacion"].transform("nunique") / 4.0 if "cliente_id" in df.columns and "tipo_operacion" in df.columns else 0
-    df["concentracion_temporal"] = df.groupby("cliente_id")["mes"].transform(lambda x: (x.value_counts().max() / len(x)) if len(x) > 0 else 0)
+    # Stats por cliente con una sola factorización de cliente_id: cada
+    # feature se calcula por código y se reparte con un gather (sin .map)
+    if "cliente_id" in df.columns:
+        cli_codes, clientes = pd.factorize(df["cliente_id"])
+        n_cli = max(len(clientes), 1)
+        con_cliente = cli_codes >= 0
+        cli_idx = np.maximum(cli_codes, 0)
+    # Diversidad: tipos distintos por cliente contando pares (cliente, tipo) únicos
+    if "cliente_id" in df.columns and "tipo_operacion" in df.columns:
+        tipo_codes, tipos = pd.factorize(df["tipo_operacion"])
+        n_tipos = max(len(tipos), 1)
+        validos = con_cliente & (tipo_codes >= 0)
+        pares = np.unique(cli_codes[validos].astype(np.int64) * n_tipos + tipo_codes[validos])
+        distintos = np.bincount(pares // n_tipos, minlength=n_cli)
+        # Sin cliente_id: NaN, igual que transform("nunique") sobre grupos descartados
+        df["diversidad_operaciones"] = np.where(con_cliente, distintos[cli_idx] / 4.0, np.nan)
+    else:
+        df["diversidad_operaciones"] = 0
+    # Concentración temporal: ops del cliente en su mes más frecuente entre
+    # el total de ops del cliente (las de mes nulo cuentan en el total, no en
+    # la tabla). Tabla cliente × mes con bincount; sin cliente o sin ningún
+    # mes válido queda NaN, igual que transform + value_counts().max().
+    if "cliente_id" in df.columns:
+        mes_codes, meses = pd.factorize(df["mes"])
+        n_meses = max(len(meses), 1)
+        validos = con_cliente & (mes_codes >= 0)
+        tabla_mes = np.bincount(
+            cli_codes[validos].astype(np.int64) * n_meses + mes_codes[validos],
+            minlength=n_cli * n_meses,
+        ).reshape(n_cli, n_meses)
+        ops_cliente = np.bincount(cli_codes[con_cliente], minlength=n_cli)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            concentracion = tabla_mes.max(axis=1) / ops_cliente
+        concentracion[tabla_mes.sum(axis=1) == 0] = np.nan
+        df["concentracion_temporal"] = np.where(con_cliente, concentracion[cli_idx], np.nan)
+    else:
+        df["concentracion_temporal"] = 0
 
     # NOTE: Remove quantile bucket features by default to limit created columns.
     # Quantile features (q) can be added later if explicitly required by a bundle.
@@ -587,12 +702,10 @@ def enriquecer_transacciones(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFr
             log(f"  ⚠️ Eliminando columnas dummy preexistentes: {cols_to_drop[:20]}")
             df = df.drop(columns=cols_to_drop, errors="ignore")
 
-        # Preserve original columns to avoid KeyError on later usage
-        preserved = {c: df[c].copy() for c in cat_cols}
-        df = pd.get_dummies(df, columns=cat_cols, drop_first=False, dtype=float)
-        # Restore original columns
-        for c, col in preserved.items():
-            df[c] = col
+        # Dummies sólo de las columnas categóricas; las originales se conservan
+        # al final (mismo orden de columnas que get_dummies + restaurar)
+        dummies = pd.get_dummies(df[cat_cols], drop_first=False, dtype=np.int8)
+        df = pd.concat([df.drop(columns=cat_cols), dummies, df[cat_cols]], axis=1)
 
     # Ensure 'fraccion' exists: if missing (e.g., dummies only), derive it from fraccion_* dummies
     if 'fraccion' not in df.columns:
@@ -604,39 +717,33 @@ def enriquecer_transacciones(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFr
 
     # If input included 'es_actividad_vulnerable' (explicit), trust it; otherwise compute from fraccion/config
     if "es_actividad_vulnerable" not in df.columns:
-        df["es_actividad_vulnerable"] = df["fraccion"].apply(lambda f: f in cfg.get("lfpiorpi", {}).get("actividad_alto_riesgo", []) if isinstance(f, str) else False).astype(int)
+        df["es_actividad_vulnerable"] = df["fraccion"].apply(lambda f: f in cfg.get("lfpiorpi", {}).get("actividad_alto_riesgo", []) if isinstance(f, str) else False).astype(np.int8)
     if "cliente_id" in df.columns:
         # Simplificado: si tiene más de 3 operaciones
-        df["posible_burst"] = (df["ops_6m"] > 3).astype(int)
+        df["posible_burst"] = (df["ops_6m"] > 3).astype(np.int8)
     else:
         df["posible_burst"] = 0
     
     # ================================================================
     # 10. Features adicionales para ML
     # ================================================================
-    df["monto_umas"] = (df["monto"] / uma).round(2) if "monto" in df.columns else 0
-    
-    # Porcentaje del umbral de aviso
-    def calc_pct_umbral(row):
-        fraccion = row.get("fraccion", "servicios_generales")
-        monto = float(row.get("monto", 0) or 0)
-        u = umbrales.get(fraccion, umbrales.get("_general", {}))
-        umbral_umas = float(u.get("aviso_UMA", 645))
-        umbral_mxn = umbral_umas * uma
-        if umbral_mxn > 0 and umbral_mxn < 100000000:
-            return round((monto / umbral_mxn) * 100, 2)
-        return 0
+    df["monto_umas"] = np.round(df["monto"].to_numpy(dtype=np.float64) / uma, 2) if "monto" in df.columns else 0
     
-    df["pct_umbral_aviso"] = df.apply(calc_pct_umbral, axis=1)
+    # Porcentaje del umbral de aviso (umbral_av_mxn calculado en el paso 5;
+    # fraccion se restaura tras los dummies, así que las filas coinciden)
+    monto_np = df["monto"].to_numpy(dtype=np.float64)
+    valido = (umbral_av_mxn > 0) & (umbral_av_mxn < 100000000)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["pct_umbral_aviso"] = np.where(valido, np.round(monto_np / umbral_av_mxn * 100, 2), 0.0)
     
     # Frecuencia mensual aproximada
-    df["frecuencia_mensual"] = (df["ops_6m"] / 6).round(0).astype(int).clip(lower=1)
+    df["frecuencia_mensual"] = (df["ops_6m"] / 6).round(0).astype(np.int32).clip(lower=1)
     
     # Ratio alto flag
-    df["ratio_alto"] = (df["ratio_vs_promedio"] > 3).astype(int)
+    df["ratio_alto"] = (df["ratio_vs_promedio"] > 3).astype(np.int8)
     
     # Frecuencia alta flag
-    df["frecuencia_alta"] = (df["ops_6m"] > 5).astype(int)
+    df["frecuencia_alta"] = (df["ops_6m"] > 5).astype(np.int8)
 
     # TODO: Implement supabase historical lookups for monto_6m by cliente_id (deferred)
     
@@ -656,6 +763,39 @@ def enrich_features(df: pd.DataFrame, cfg: Optional[Dict[str, Any]] = None) -> p
 # ============================================================================
 # PIPELINE PRINCIPAL
 # ============================================================================
+def leer_csv(input_file: Path) -> pd.DataFrame:
+    """
+    Lee el CSV de entrada. Con pyarrow instalado usa su parser multihilo
+    (engine="pyarrow"); si no está o el archivo no lo soporta, usa el de pandas.
+    """
+    if pa is not None:
+        try:
+            return pd.read_csv(input_file, engine="pyarrow")
+        except Exception as e:
+            log(f"  ⚠️ Lectura con pyarrow falló ({e}); usando parser de pandas")
+    return pd.read_csv(input_file)
+
+
+def guardar_enriquecido(df: pd.DataFrame, output_path: Path, output_format: str = "csv") -> Path:
+    """
+    Guarda el DataFrame enriquecido y devuelve la ruta escrita.
+    
+    - "csv": df.to_csv (formato de fechas y comillas que espera ml_runner).
+    - "parquet": Parquet (zstd) con el mismo nombre base; sin pyarrow, CSV.
+    """
+    if output_format == "parquet" and pa is None:
+        log("  ⚠️ pyarrow no está instalado; se guarda en CSV")
+        output_format = "csv"
+    
+    if output_format == "parquet":
+        output_path = Path(output_path).with_suffix(".parquet")
+        df.to_parquet(output_path, engine="pyarrow", compression="zstd", index=False)
+        return output_path
+    
+    df.to_csv(output_path, index=False, encoding="utf-8")
+    return output_path
+
+
 def procesar_archivo(
     input_path: Optional[str] = None,
     output_path: Optional[str] = None,
@@ -667,11 +807,14 @@ def procesar_archivo(
     analysis_id: Optional[str] = None,
     # If True, returns just the path string (used by some callers). Default: False
     return_path_only: bool = False,
+    output_format: str = "csv",
     **kwargs
 ) -> Tuple[bool, str, Optional[pd.DataFrame]] | str:
     """
     Procesa un archivo CSV/Excel y genera CSV enriquecido.
     
+    output_format="parquet" escribe Parquet (mismo nombre base, .parquet).
+    
     Returns:
         (success, message, df_enriched)
     """
@@ -698,7 +841,7 @@ def procesar_archivo(
         if input_file.suffix.lower() in [".xlsx", ".xls"]:
             df = pd.read_excel(input_file)
         else:
-            df = pd.read_csv(input_file)
+            df = leer_csv(input_file)
         
         log(f"  📊 Cargado: {len(df)} filas, {len(df.columns)} columnas")
         log(f"  📋 Columnas: {list(df.columns)}")
@@ -744,7 +887,7 @@ def procesar_archivo(
             output_path = Path(output_path)
             output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        df.to_csv(output_path, index=False, encoding="utf-8")
+        output_path = guardar_enriquecido(df, output_path, output_format)
         
         log(f"\n  ✅ Guardado: {output_path}")
         log(f"{'='*70}\n")
@@ -772,10 +915,13 @@ def main():
     parser.add_argument("input", help="Archivo CSV o Excel de entrada")
     parser.add_argument("--output", "-o", help="Archivo de salida (opcional)")
     parser.add_argument("--config", "-c", help="Ruta a config_modelos.json (opcional)")
+    parser.add_argument("--output_format", choices=["csv", "parquet"], default="csv",
+                        help="Formato de salida (default: csv)")
     
     args = parser.parse_args()
     
-    success, message, df = procesar_archivo(args.input, args.output, args.config)
+    success, message, df = procesar_archivo(args.input, args.output, args.config,
+                                            output_format=args.output_format)
     
     if success:
         print(f"\n✅ Éxito: {message}")
@@ -20,7 +20,14 @@ import json
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import lru_cache
+
+# Opcional: parser CSV multihilo de Arrow
+try:
+    import pyarrow  # noqa: F401
+except Exception:
+    pyarrow = None
 
 # =====================================================
 # DICCIONARIO MAESTRO DE NORMALIZACIÓN
@@ -102,6 +109,13 @@ SECTOR_TO_FRACCION_MAP = {
     "defi": "XVI_activos_virtuales",
 }
 
+# Tablas derivadas, calculadas una sola vez al importar:
+#   _TRANS     → quita acentos (á→a, ..., ñ→n)
+#   _KEYWORDS  → (keyword, fraccion) en el orden del mapa para el match parcial
+_TRANS = str.maketrans("áéíóúñ", "aeioun")
+_KEYWORDS = tuple(SECTOR_TO_FRACCION_MAP.items())
+
+
 def normalizar_sector(sector_raw):
     """
     Normaliza el sector del usuario a fracción LFPIORPI
@@ -122,11 +136,14 @@ def normalizar_sector(sector_raw):
     """
     if not sector_raw or pd.isna(sector_raw):
         return "_"
-    
+    return _normalizar_sector_texto(str(sector_raw))
+
+
+@lru_cache(maxsize=4096)
+def _normalizar_sector_texto(sector_raw: str) -> str:
+    """normalizar_sector para texto ya validado; memoizado por valor crudo."""
     # Normalizar texto
-    sector_clean = str(sector_raw).strip().lower()
-    sector_clean = sector_clean.replace("á", "a").replace("é", "e").replace("í", "i")
-    sector_clean = sector_clean.replace("ó", "o").replace("ú", "u").replace("ñ", "n")
+    sector_clean = sector_raw.strip().lower().translate(_TRANS)
     
     # Buscar match exacto
     if sector_clean in SECTOR_TO_FRACCION_MAP:
@@ -137,8 +154,8 @@ def normalizar_sector(sector_raw):
     if sector_underscore in SECTOR_TO_FRACCION_MAP:
         return SECTOR_TO_FRACCION_MAP[sector_underscore]
     
-    # Buscar match parcial (contiene keyword)
-    for keyword, fraccion in SECTOR_TO_FRACCION_MAP.items():
+    # Buscar match parcial (contiene keyword); gana la primera en orden del mapa
+    for keyword, fraccion in _KEYWORDS:
         if keyword in sector_clean or sector_clean in keyword:
             return fraccion
     
@@ -146,98 +163,259 @@ def normalizar_sector(sector_raw):
     return "_"
 
 
+def normalizar_sector_series(sectores: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada de normalizar_sector para una columna completa.
+
+    El texto se limpia con operaciones de pandas y los matches exactos (tal
+    cual o con guiones bajos) salen de .map(SECTOR_TO_FRACCION_MAP); sólo los
+    valores distintos sin match exacto pasan por normalizar_sector (match
+    parcial).
+    """
+    limpio = (
+        sectores.astype("string")
+        .str.strip()
+        .str.lower()
+        .str.translate(_TRANS)
+    )
+    fraccion = limpio.map(SECTOR_TO_FRACCION_MAP).astype(object)
+    fraccion = fraccion.fillna(
+        limpio.str.replace(" ", "_", regex=False).map(SECTOR_TO_FRACCION_MAP).astype(object)
+    )
+
+    pendientes = fraccion.isna().to_numpy()
+    if pendientes.any():
+        codes, uniques = pd.factorize(sectores[pendientes], use_na_sentinel=False)
+        resueltos = np.array([normalizar_sector(u) for u in uniques], dtype=object)
+        fraccion[pendientes] = resueltos[codes]
+    return fraccion
+
+
 def log(msg):
     """Print timestamped log message"""
     ts = datetime.now().strftime("%H:%M:%S")
     print(f"[{ts}] {msg}", flush=True)
 
 
+def leer_csv(file_path):
+    """
+    Lee el CSV de entrada. Con pyarrow instalado usa su parser multihilo
+    (engine="pyarrow"); si no está o el archivo no lo soporta, usa el de pandas.
+    """
+    if pyarrow is not None:
+        try:
+            return pd.read_csv(file_path, engine="pyarrow", encoding="utf-8-sig")
+        except Exception as e:
+            log(f"⚠️  Lectura con pyarrow falló ({e}); usando parser de pandas")
+    return pd.read_csv(file_path, encoding="utf-8-sig", skip_blank_lines=True)
+
+
+_CONFIG_CACHE = {}
+
+
 def load_config(config_path):
-    """Load config_modelos.json"""
+    """Load config_modelos.json (cacheado por ruta; se parsea una sola vez)"""
+    cache_key = str(Path(config_path).resolve())
+    if cache_key in _CONFIG_CACHE:
+        return _CONFIG_CACHE[cache_key]
     with open(config_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+        cfg = json.load(f)
+    _CONFIG_CACHE[cache_key] = cfg
+    return cfg
+
+
+def parsear_fechas(fechas: pd.Series) -> pd.Series:
+    """
+    Convierte fechas a datetime con el parser rápido de ISO8601; sólo los
+    valores que no son ISO (p.ej. "31/01/2024") pasan por la inferencia
+    genérica de pandas.
+    """
+    fecha_dt = pd.to_datetime(fechas, format="ISO8601", errors="coerce")
+    pendientes = fecha_dt.isna() & fechas.notna()
+    if pendientes.any():
+        fecha_dt[pendientes] = pd.to_datetime(fechas[pendientes], errors="coerce")
+    return fecha_dt
+
+
+def _cuantil(valores: np.ndarray, q: float) -> float:
+    """Cuantil lineal (igual que Series.quantile) ignorando NaN; NaN si no hay datos."""
+    validos = valores[~np.isnan(valores)]
+    return float(np.quantile(validos, q)) if len(validos) else np.nan
+
+
+def _ordenado_por_cliente_fecha(df: pd.DataFrame) -> bool:
+    """True si df ya está ordenado por (cliente_id, fecha_dt) y sin nulos en ellos."""
+    cliente = df["cliente_id"]
+    if cliente.isna().any() or df["fecha_dt"].isna().any():
+        return False
+    try:
+        if not cliente.is_monotonic_increasing:
+            return False
+    except TypeError:
+        return False
+    mismo_cliente = cliente.to_numpy()[1:] == cliente.to_numpy()[:-1]
+    fechas = df["fecha_dt"].to_numpy()
+    return bool(np.all(~mismo_cliente | (fechas[1:] >= fechas[:-1])))
 
 
 def enrich_features(df: pd.DataFrame) -> pd.DataFrame:
     """
     Agrega 20 features de enriquecimiento para ML
+
+    Trabaja en sitio (sin copiar la entrada): las columnas nuevas se agregan
+    al DataFrame recibido. Usar siempre el DataFrame devuelto, que además
+    viene ordenado por cliente_id/fecha.
     """
-    df = df.copy()
-    
     # Fecha a datetime
-    df["fecha_dt"] = pd.to_datetime(df["fecha"], errors="coerce")
-    
-    # Features binarias
-    df["EsEfectivo"] = (df["tipo_operacion"] == "efectivo").astype(int)
-    df["EsInternacional"] = (df["tipo_operacion"] == "transferencia_internacional").astype(int)
+    df["fecha_dt"] = parsear_fechas(df["fecha"])
+    
+    # Features binarias y temporales: un solo DatetimeIndex y arrays numpy,
+    # sin Series intermedias por cada comparación
+    fechas = pd.DatetimeIndex(df["fecha_dt"])
+    monto = df["monto"].to_numpy()
+    hora = fechas.hour.to_numpy()
+    dia_semana = fechas.dayofweek.to_numpy()
+    
+    # EsEfectivo / EsInternacional: una sola clasificación por tipo_operacion
+    # distinto; el código -1 (nulo) cae en el False agregado al final
+    codigos, tipos = pd.factorize(df["tipo_operacion"])
+    tipos = np.append(np.asarray(tipos, dtype=object), None)
+    df["EsEfectivo"] = (tipos == "efectivo")[codigos].astype(np.int8)
+    df["EsInternacional"] = (tipos == "transferencia_internacional")[codigos].astype(np.int8)
     
     # Temporales
-    df["fin_de_semana"] = df["fecha_dt"].dt.dayofweek.isin([5, 6]).astype(int)
-    df["es_nocturno"] = ((df["fecha_dt"].dt.hour >= 0) & (df["fecha_dt"].dt.hour < 6)).astype(int)
-    df["es_monto_redondo"] = (df["monto"] % 1000 == 0).astype(int)
-    df["mes"] = df["fecha_dt"].dt.month
-    df["dia_semana"] = df["fecha_dt"].dt.dayofweek
-    df["quincena"] = (df["fecha_dt"].dt.day > 15).astype(int)
+    df["fin_de_semana"] = (dia_semana >= 5).astype(np.int8)
+    df["es_nocturno"] = ((hora >= 0) & (hora < 6)).astype(np.int8)
+    # Monto redondo (múltiplo de 1,000) en centavos enteros: sin fmod en
+    # float y sin que el ruido de redondeo lo rompa (10000.0000001)
+    monto_f = np.asarray(monto, dtype=np.float64)
+    finito = np.isfinite(monto_f)
+    centavos = np.rint(np.where(finito, monto_f, 0.0) * 100).astype(np.int64)
+    df["es_monto_redondo"] = (finito & (centavos % 100_000 == 0)).astype(np.int8)
+    df["mes"] = fechas.month.to_numpy()
+    df["dia_semana"] = dia_semana
+    df["quincena"] = (fechas.day.to_numpy() > 15).astype(np.int8)
     
     # Agregar frecuencia_mensual (placeholder)
     df["frecuencia_mensual"] = 1  # Se calcularía en un sistema real
     
     # Rolling features (por cliente)
-    df = df.sort_values(["cliente_id", "fecha_dt"]).reset_index(drop=True)
+    # Si la entrada ya viene ordenada por cliente/fecha, se evita el sort
+    if _ordenado_por_cliente_fecha(df):
+        df = df.reset_index(drop=True)
+    else:
+        df = df.sort_values(["cliente_id", "fecha_dt"]).reset_index(drop=True)
     
-    rolling_cols = []
-    for col in ["monto_6m", "ops_6m", "monto_max_6m", "monto_std_6m"]:
+    # Ventana de 6 meses (180 días) por cliente, cerrada en ambos extremos:
+    # groupby().rolling() en Cython en lugar de recorrer fila por fila.
+    rolling_cols = ["monto_6m", "ops_6m", "monto_max_6m", "monto_std_6m"]
+    for col in rolling_cols:
         df[col] = 0.0
-        rolling_cols.append(col)
-    
-    # Calcular por cliente
-    for cliente_id in df["cliente_id"].unique():
-        mask = df["cliente_id"] == cliente_id
-        cliente_df = df[mask].sort_values("fecha_dt")
-        
-        # Window de 6 meses (180 días)
-        window_days = 180
-        
-        for idx in cliente_df.index:
-            fecha_actual = df.loc[idx, "fecha_dt"]
-            fecha_inicio = fecha_actual - timedelta(days=window_days)
-            
-            # Transacciones previas del cliente en ventana
-            mask_ventana = (df["cliente_id"] == cliente_id) & \
-                          (df["fecha_dt"] >= fecha_inicio) & \
-                          (df["fecha_dt"] <= fecha_actual)
-            
-            ventana_df = df[mask_ventana]
-            
-            if len(ventana_df) > 0:
-                df.loc[idx, "monto_6m"] = ventana_df["monto"].sum()
-                df.loc[idx, "ops_6m"] = len(ventana_df)
-                df.loc[idx, "monto_max_6m"] = ventana_df["monto"].max()
-                df.loc[idx, "monto_std_6m"] = ventana_df["monto"].std() if len(ventana_df) > 1 else 0.0
-    
+
+    validas = df["cliente_id"].notna() & df["fecha_dt"].notna()
+    if validas.any():
+        base = df.loc[validas, ["cliente_id", "fecha_dt", "monto"]]
+        base["_op"] = 1.0
+        ventana = base.groupby("cliente_id", sort=False).rolling("180D", on="fecha_dt", closed="both")
+        # base está ordenado por cliente, así que el resultado (sort=False)
+        # sale en el mismo orden de filas que base
+        # Como en el cálculo por fila: una ventana sólo con montos nulos suma 0
+        # y la desviación es 0 sólo si la ventana tiene una operación
+        ops_6m = ventana["_op"].sum().to_numpy()
+        stats = np.column_stack([
+            np.nan_to_num(ventana["monto"].sum().to_numpy(), nan=0.0),
+            ops_6m,
+            ventana["monto"].max().to_numpy(),
+            np.where(ops_6m > 1, ventana["monto"].std().to_numpy(), 0.0),
+        ])
+
+        # Operaciones con la misma fecha comparten ventana completa: todas
+        # toman la fila de la última (por posición; base está ordenado, así
+        # que cada par cliente/fecha es contiguo)
+        claves = base[["cliente_id", "fecha_dt"]]
+        ultima = np.flatnonzero(~claves.duplicated(keep="last").to_numpy())
+        grupo = np.cumsum(~claves.duplicated(keep="first").to_numpy()) - 1
+        df.loc[validas, rolling_cols] = stats[ultima[grupo]]
+
     # Features derivadas
     total_ops = len(df)
     df["ops_relativas"] = df["ops_6m"] / total_ops if total_ops > 0 else 0
-    df["diversidad_operaciones"] = df.groupby("cliente_id")["tipo_operacion"].transform("nunique") / 4.0
-    df["concentracion_temporal"] = df.groupby("cliente_id")["mes"].transform(lambda x: (x.value_counts().max() / len(x)) if len(x) > 0 else 0)
+    
+    # Agregados por cliente con códigos de factorize y bincount:
+    #   diversidad_operaciones = tipos de operación distintos / 4
+    #   concentracion_temporal = ops del mes más frecuente / ops del cliente
+    # Filas sin cliente_id quedan en NaN (como el groupby, que las descarta).
+    cli, clientes = pd.factorize(df["cliente_id"])
+    n_cli = max(len(clientes), 1)
+    con_cliente = cli >= 0
+    ops = np.bincount(cli[con_cliente], minlength=n_cli)
+    
+    tipo, tipos = pd.factorize(df["tipo_operacion"])
+    n_tipos = max(len(tipos), 1)
+    validos = con_cliente & (tipo >= 0)
+    pares = np.unique(cli[validos].astype(np.int64) * n_tipos + tipo[validos])
+    tipos_distintos = np.bincount(pares // n_tipos, minlength=n_cli)
+    
+    mes_cod, meses = pd.factorize(df["mes"])
+    n_meses = max(len(meses), 1)
+    validos = con_cliente & (mes_cod >= 0)
+    por_mes = np.bincount(
+        cli[validos].astype(np.int64) * n_meses + mes_cod[validos], minlength=n_cli * n_meses
+    ).reshape(n_cli, n_meses).max(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        concentracion = np.where(por_mes > 0, por_mes / ops, np.nan)
+    
+    idx = np.maximum(cli, 0)
+    df["diversidad_operaciones"] = np.where(con_cliente, tipos_distintos[idx] / 4.0, np.nan)
+    df["concentracion_temporal"] = np.where(con_cliente, concentracion[idx], np.nan)
     
     # Ratio vs promedio
     monto_promedio = df["monto"].mean()
     df["ratio_vs_promedio"] = df["monto"] / monto_promedio if monto_promedio > 0 else 1.0
     
     # Posible burst (operaciones concentradas)
-    df["posible_burst"] = ((df["ops_6m"] > df["ops_6m"].quantile(0.95)) & 
-                           (df["monto"] > df["monto"].quantile(0.75))).astype(int)
+    # Umbrales calculados una vez sobre arrays numpy (np.quantile usa
+    # selección por partición, sin ordenar todo el array)
+    ops_6m = df["ops_6m"].to_numpy(dtype=np.float64)
+    monto = df["monto"].to_numpy(dtype=np.float64)
+    umbral_ops = _cuantil(ops_6m, 0.95)
+    umbral_monto = _cuantil(monto, 0.75)
+    df["posible_burst"] = ((ops_6m > umbral_ops) & (monto > umbral_monto)).astype(np.int8)
     
     return df
 
 
+def _enriched_path(file_path) -> Path:
+    """<dir>/<stem>_enriched.csv junto al archivo de entrada (sin tocar el resto del nombre)."""
+    p = Path(file_path)
+    return p.with_name(f"{p.stem}_enriched.csv")
+
+
+def guardar_enriquecido(df: pd.DataFrame, output_path, output_format: str = "csv"):
+    """
+    Guarda el DataFrame enriquecido. output_format="parquet" escribe Parquet
+    (zstd) junto a output_path con extensión .parquet; sin pyarrow, o con
+    "csv", escribe CSV. Devuelve la ruta escrita.
+    """
+    if output_format == "parquet" and pyarrow is None:
+        log("⚠️  pyarrow no está instalado; se guarda en CSV")
+        output_format = "csv"
+    
+    if output_format == "parquet":
+        output_path = Path(output_path).with_suffix(".parquet")
+        df.to_parquet(output_path, engine="pyarrow", compression="zstd", index=False)
+    else:
+        df.to_csv(output_path, index=False, encoding="utf-8")
+    return output_path
+
+
 def procesar_archivo(
     file_path: str,
     sector_actividad: str = "use_file",
     config_path: str = None,
     training_mode: bool = False,
-    analysis_id: str = None
+    analysis_id: str = None,
+    output_format: str = "csv"
 ):
     """
     Procesa archivo CSV: valida estructura y enriquece con features
@@ -248,6 +426,7 @@ def procesar_archivo(
         config_path: Ruta a config_modelos.json
         training_mode: Si True, agrega clasificacion_lfpiorpi (solo entrenamiento)
         analysis_id: ID único para guardar en pending/ (modo inferencia)
+        output_format: "csv" (default) o "parquet" (mismo nombre base, .parquet)
     
     Returns:
         str: Ruta al archivo enriquecido
@@ -265,9 +444,15 @@ def procesar_archivo(
     config = load_config(str(config_path))
     
     # Load CSV
-    df = pd.read_csv(file_path, encoding="utf-8-sig", skip_blank_lines=True)
+    df = leer_csv(file_path)
     log(f"Cargado: {len(df)} filas, {len(df.columns)} columnas")
     
+    # Columnas de baja cardinalidad como categóricas: comparaciones, isin y
+    # groupby trabajan sobre códigos enteros en lugar de objetos str
+    for col in ("sector_actividad", "tipo_operacion"):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    
     # Validar columnas requeridas
     required = ["cliente_id", "monto", "fecha", "tipo_operacion"]
     missing = [c for c in required if c not in df.columns]
@@ -278,7 +463,7 @@ def procesar_archivo(
     if "sector_actividad" in df.columns:
         log(f"📋 Normalizando {len(df['sector_actividad'].unique())} sectores únicos...")
         
-        df["fraccion"] = df["sector_actividad"].apply(normalizar_sector)
+        df["fraccion"] = normalizar_sector_series(df["sector_actividad"]).astype("category")
         
         # Reportar mapeos
         mapeos = df[["sector_actividad", "fraccion"]].drop_duplicates()
@@ -299,7 +484,7 @@ def procesar_archivo(
     
     # Detectar SectorAltoRiesgo
     sectores_alto_riesgo = config.get("lfpiorpi", {}).get("actividad_alto_riesgo", [])
-    df["SectorAltoRiesgo"] = df["fraccion"].isin(["XVI_activos_virtuales", "X_traslado_valores"]).astype(int)
+    df["SectorAltoRiesgo"] = df["fraccion"].isin(["XVI_activos_virtuales", "X_traslado_valores"]).astype(np.int8)
     
     # Enriquecer features
     log("🔧 Enriqueciendo features...")
@@ -310,8 +495,8 @@ def procesar_archivo(
     # Guardar archivo enriquecido
     if training_mode:
         # Modo entrenamiento: guardar con _clase_interna
-        output_path = file_path.replace(".csv", "_enriched.csv")
-        df.to_csv(output_path, index=False, encoding="utf-8")
+        output_path = _enriched_path(file_path)
+        output_path = guardar_enriquecido(df, output_path, output_format)
         log(f"✅ Guardado (training): {output_path}")
     else:
         # Modo inferencia: guardar en outputs/enriched/pending/
@@ -323,7 +508,7 @@ def procesar_archivo(
         pending_dir.mkdir(parents=True, exist_ok=True)
         
         output_path = pending_dir / f"{analysis_id}.csv"
-        df.to_csv(output_path, index=False, encoding="utf-8")
+        output_path = guardar_enriquecido(df, output_path, output_format)
         log(f"✅ Guardado (inferencia): {output_path}")
     
     log("==== FIN VALIDACIÓN/ENRIQUECIMIENTO ====\n")
@@ -17,25 +17,56 @@ Flujo:
 
 import argparse
 import json
+import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Dict, Tuple, List, Any, Optional, Union
+from types import MappingProxyType
+from typing import Dict, Tuple, List, Any, Mapping, Optional, Sequence, Union
 
 import numpy as np
 import pandas as pd
 
+# Opcional: lector CSV multihilo y Parquet de Arrow
+try:
+    import pyarrow
+except Exception:
+    pyarrow = None
+
+# Opcional: parser JSON nativo; sin él se usa json de la stdlib
+try:
+    import orjson
+except Exception:
+    orjson = None
+
 
 # ============================================================================
 # CONFIG
 # ============================================================================
 
+# Config ya parseado por (ruta resuelta, mtime): si el archivo cambia se relee
+_CONFIG_CACHE: Dict[Tuple[str, float], Dict[str, Any]] = {}
+
+
+def _leer_json_cacheado(path_obj: Path) -> Dict[str, Any]:
+    cache_key = (str(path_obj.resolve()), path_obj.stat().st_mtime)
+    if cache_key not in _CONFIG_CACHE:
+        if orjson is not None:
+            _CONFIG_CACHE[cache_key] = orjson.loads(path_obj.read_bytes())
+        else:
+            with path_obj.open("r", encoding="utf-8") as f:
+                _CONFIG_CACHE[cache_key] = json.load(f)
+    return _CONFIG_CACHE[cache_key]
+
+
 def cargar_config(path: str) -> Dict[str, Any]:
     path_obj = Path(path)
     if not path_obj.exists():
         raise FileNotFoundError(f"No se encontró archivo de configuración: {path}")
-    with path_obj.open("r", encoding="utf-8") as f:
-        cfg = json.load(f)
-    return cfg
+    return _leer_json_cacheado(path_obj)
 
 
 def get_uma_mxn(cfg: Dict[str, Any]) -> float:
@@ -60,7 +91,7 @@ def validar_y_limpiar(
     - Convierte tipos básicos (monto, fecha)
     - Separa filas inválidas
     """
-    df = df.copy()
+    df = df.copy(deep=False)
 
     # 1) Columnas obligatorias
     obligatorios = cfg_validacion.get("campos_obligatorios", [])
@@ -91,42 +122,49 @@ def validar_y_limpiar(
 # FEATURES AUXILIARES
 # ============================================================================
 
+_RE_EFECTIVO = re.compile("efectivo|cash|efvo")
+_RE_INTERNACIONAL = re.compile("internacional|international|foreign|extranjero|ext")
+
+
+def _detectar_patron(series_tipo: pd.Series, patron: "re.Pattern[str]") -> pd.Series:
+    """Evalúa el patrón una vez por valor distinto y expande con los códigos."""
+    codes, tipos = pd.factorize(series_tipo, use_na_sentinel=False)
+    coincide = np.array([patron.search(str(t).lower()) is not None for t in tipos], dtype=np.int8)
+    return pd.Series(coincide[codes], index=series_tipo.index, name=series_tipo.name)
+
+
 def detectar_efectivo(series_tipo: pd.Series) -> pd.Series:
-    st = series_tipo.astype(str).str.lower()
-    patrones = ["efectivo", "cash", "efvo"]
-    mask = False
-    for p in patrones:
-        mask = mask | st.str.contains(p)
-    return mask.astype(int)
+    return _detectar_patron(series_tipo, _RE_EFECTIVO)
 
 
 def detectar_internacional(series_tipo: pd.Series) -> pd.Series:
-    st = series_tipo.astype(str).str.lower()
-    patrones = ["internacional", "international", "foreign", "extranjero", "ext"]
-    mask = False
-    for p in patrones:
-        mask = mask | st.str.contains(p)
-    return mask.astype(int)
+    return _detectar_patron(series_tipo, _RE_INTERNACIONAL)
 
 
 def calcular_features_temporales(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    # Asumimos fecha ya es datetime
-    df["dia_semana"] = df["fecha"].dt.dayofweek  # 0=lun, 6=dom
-    df["mes"] = df["fecha"].dt.month
-    df["fin_de_semana"] = df["dia_semana"].isin([5, 6]).astype(int)
-    df["quincena"] = (df["fecha"].dt.day > 15).astype(int)
+    df = df.copy(deep=False)
+    # Asumimos fecha ya es datetime; un solo DatetimeIndex para todas las partes
+    fechas = pd.DatetimeIndex(df["fecha"])
+    df["dia_semana"] = fechas.dayofweek  # 0=lun, 6=dom
+    df["mes"] = fechas.month
+    if not fechas.hasnans:
+        # Sin NaT las partes de fecha caben en int8
+        df["dia_semana"] = df["dia_semana"].astype(np.int8)
+        df["mes"] = df["mes"].astype(np.int8)
+    df["fin_de_semana"] = df["dia_semana"].isin([5, 6]).astype(np.int8)
+    df["quincena"] = (fechas.day > 15).astype(np.int8)
 
     # Hora: si viene por separado o de la propia fecha
+    hora_fecha = pd.Series(fechas.hour, index=df.index)
     if "hora" in df.columns:
         hora_num = pd.to_numeric(df["hora"], errors="coerce")
-        hora_num = hora_num.fillna(df["fecha"].dt.hour)
+        hora_num = hora_num.fillna(hora_fecha)
     else:
-        hora_num = df["fecha"].dt.hour
+        hora_num = hora_fecha
 
     df["hora_num"] = hora_num
     df["es_nocturno"] = df["hora_num"].between(22, 23) | df["hora_num"].between(0, 5)
-    df["es_nocturno"] = df["es_nocturno"].astype(int)
+    df["es_nocturno"] = df["es_nocturno"].astype(np.int8)
     return df
 
 
@@ -141,35 +179,36 @@ def calcular_ventanas_6m(df: pd.DataFrame) -> pd.DataFrame:
     - monto_promedio_cliente
     - ratio_vs_promedio
     """
-    df = df.copy()
-    # Promedio histórico por cliente
-    df["monto_promedio_cliente"] = (
-        df.groupby("cliente_id")["monto"].transform("mean").replace(0, np.nan)
-    )
+    df = df.copy(deep=False)
+    # Promedio histórico por cliente (suma y conteo con bincount; montos NaN
+    # no cuentan, igual que transform("mean"))
+    cli, clientes = pd.factorize(df["cliente_id"])
+    monto = df["monto"].to_numpy(dtype=np.float64)
+    validos = (cli >= 0) & ~np.isnan(monto)
+    n_cli = max(len(clientes), 1)
+    suma = np.bincount(cli[validos], weights=monto[validos], minlength=n_cli)
+    conteo = np.bincount(cli[validos], minlength=n_cli)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        promedio = suma / conteo
+    promedio[promedio == 0] = np.nan
+    df["monto_promedio_cliente"] = np.where(cli >= 0, promedio[np.maximum(cli, 0)], np.nan)
     df["ratio_vs_promedio"] = df["monto"] / df["monto_promedio_cliente"]
     df["ratio_vs_promedio"] = df["ratio_vs_promedio"].fillna(1.0)
 
-    # Rolling 180 días por cliente
-    df = df.sort_values(["cliente_id", "fecha"])
-    def _rolling_6m(g: pd.DataFrame) -> pd.DataFrame:
-        g = g.set_index("fecha").sort_index()
-        # Rolling 180D sobre monto
-        roll = g["monto"].rolling("180D", closed="both")
-        g["monto_6m"] = roll.sum()
-        g["ops_6m"] = roll.count()
-        g["monto_max_6m"] = roll.max()
-        g["monto_std_6m"] = roll.std().fillna(0.0)
-        return g.reset_index()
-
-    df = (
-        df.groupby("cliente_id", group_keys=False)
-        .apply(_rolling_6m)
-        .reset_index(drop=True)
-    )
+    # Rolling 180 días por cliente: un solo groupby().rolling() sobre el df
+    # ordenado (sin apply por grupo). Las filas sin cliente_id se descartan,
+    # igual que en el groupby; con sort=False los grupos salen en el orden
+    # del df, así que el resultado se asigna por posición.
+    df = df[df["cliente_id"].notna()].sort_values(["cliente_id", "fecha"]).reset_index(drop=True)
+    roll = df.groupby("cliente_id", sort=False).rolling("180D", on="fecha", closed="both")["monto"]
+    df["monto_6m"] = roll.sum().to_numpy()
+    df["ops_6m"] = roll.count().to_numpy()
+    df["monto_max_6m"] = roll.max().to_numpy()
+    df["monto_std_6m"] = np.nan_to_num(roll.std().to_numpy(), nan=0.0)
 
     # Por si algún cliente tiene una sola operación
     df["monto_6m"] = df["monto_6m"].fillna(df["monto"])
-    df["ops_6m"] = df["ops_6m"].fillna(1)
+    df["ops_6m"] = df["ops_6m"].fillna(1).astype(np.int32)
     df["monto_max_6m"] = df["monto_max_6m"].fillna(df["monto"])
     df["monto_std_6m"] = df["monto_std_6m"].fillna(0.0)
 
@@ -184,6 +223,52 @@ def obtener_umbrales_fraccion(cfg: Dict[str, Any], fraccion: str) -> Dict[str, A
     return umbrales.get("_general", {})
 
 
+@dataclass(frozen=True)
+class ParametrosFraccion:
+    """Umbrales ya convertidos a MXN para una fracción de un config."""
+    uma_mxn: float
+    aviso_mxn: float
+    efectivo_mxn: float
+    es_vulnerable: bool
+    alto_riesgo: frozenset
+
+
+# (id(cfg), fracción) -> (cfg, parámetros); se guarda el propio cfg para
+# que el id no se reutilice mientras la entrada exista. Acotado: quien llama
+# puede construir un cfg nuevo por petición, así que al llenarse se descarta
+# la entrada más antigua
+_PARAMS_CACHE: Dict[Tuple[int, str], Tuple[Dict[str, Any], ParametrosFraccion]] = {}
+_PARAMS_CACHE_MAX = 128
+
+
+def parametros_fraccion(cfg: Dict[str, Any], fraccion: str) -> ParametrosFraccion:
+    """Parámetros de enriquecimiento de la fracción, calculados una vez por config."""
+    cache_key = (id(cfg), fraccion)
+    entrada = _PARAMS_CACHE.get(cache_key)
+    if entrada is not None and entrada[0] is cfg:
+        return entrada[1]
+
+    uma_mxn = get_uma_mxn(cfg)
+    info_frac = obtener_umbrales_fraccion(cfg, fraccion)
+    aviso_UMA = float(info_frac.get("aviso_UMA", 645))
+    efectivo_max_UMA = float(info_frac.get("efectivo_max_UMA", 0))
+    if efectivo_max_UMA <= 0:
+        # si no hay umbral específico de efectivo, usar aviso
+        efectivo_max_UMA = aviso_UMA
+
+    params = ParametrosFraccion(
+        uma_mxn=uma_mxn,
+        aviso_mxn=aviso_UMA * uma_mxn,
+        efectivo_mxn=efectivo_max_UMA * uma_mxn,
+        es_vulnerable=bool(info_frac.get("es_actividad_vulnerable", True)),
+        alto_riesgo=frozenset(cfg.get("lfpiorpi", {}).get("actividad_alto_riesgo", [])),
+    )
+    if cache_key not in _PARAMS_CACHE and len(_PARAMS_CACHE) >= _PARAMS_CACHE_MAX:
+        del _PARAMS_CACHE[next(iter(_PARAMS_CACHE))]
+    _PARAMS_CACHE[cache_key] = (cfg, params)
+    return params
+
+
 # ============================================================================
 # ENRIQUECIMIENTO ART.17 (ACTIVIDAD VULNERABLE)
 # ============================================================================
@@ -216,20 +301,20 @@ def enriquecer_art17(
     Enriquecimiento para sujetos de ACTIVIDAD VULNERABLE (Art. 17)
     con fracción fija por usuario (perfil).
     """
-    df = df.copy()
-    uma_mxn = get_uma_mxn(cfg)
+    df = df.copy(deep=False)
 
     # Ensure fraccion is a string and always present as column for downstream steps
     fr = str(fraccion_lfpiorpi) if fraccion_lfpiorpi is not None else "servicios_generales"
-    df["fraccion"] = fr
+    # Constante por llamada: categórica de una sola categoría (1 byte/fila)
+    df["fraccion"] = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), categories=[fr])
 
-    # Fracción info + flags de vulnerabilidad / alto riesgo
-    info_frac = obtener_umbrales_fraccion(cfg, fr)
-    es_vulnerable = bool(info_frac.get("es_actividad_vulnerable", True))
-    df["es_actividad_vulnerable"] = int(es_vulnerable)
+    # Umbrales en MXN + flags de vulnerabilidad / alto riesgo (cacheados por config)
+    params = parametros_fraccion(cfg, fr)
+    uma_mxn = params.uma_mxn
+    df["es_actividad_vulnerable"] = np.int8(params.es_vulnerable)
 
-    actividades_alto_riesgo = set(cfg.get("lfpiorpi", {}).get("actividad_alto_riesgo", []))
-    df["SectorAltoRiesgo"] = (df["fraccion"].apply(lambda x: str(x) in actividades_alto_riesgo)).astype(int)
+    # fraccion es constante en todo el df: basta una prueba escalar
+    df["SectorAltoRiesgo"] = np.int8(fr in params.alto_riesgo)
 
     # Flags por tipo de operación
     df["tipo_operacion"] = df["tipo_operacion"].astype(str)
@@ -243,29 +328,29 @@ def enriquecer_art17(
     df = calcular_ventanas_6m(df)
 
     # UMA & umbrales por fracción
-    aviso_UMA = float(info_frac.get("aviso_UMA", 645))
-    aviso_mxn = aviso_UMA * uma_mxn
-
-    efectivo_max_UMA = float(info_frac.get("efectivo_max_UMA", 0))
-    if efectivo_max_UMA <= 0:
-        # si no hay umbral específico de efectivo, usar aviso
-        efectivo_max_UMA = aviso_UMA
-    efectivo_mxn = efectivo_max_UMA * uma_mxn
+    aviso_mxn = params.aviso_mxn
+    efectivo_mxn = params.efectivo_mxn
 
     # Features LFPIORPI / UMA
+    # aviso_mxn es escalar: se decide fuera del vector. Se divide (no se
+    # multiplica por el recíproco) para que un monto exactamente en el umbral
+    # dé exactamente el umbral en UMAs / 100%.
     df["monto_umas"] = df["monto"] / uma_mxn
-    df["pct_umbral_aviso"] = np.where(
-        aviso_mxn > 0,
-        (df["monto"] / aviso_mxn) * 100.0,
-        0.0,
-    )
+    if aviso_mxn > 0:
+        df["pct_umbral_aviso"] = df["monto"] / aviso_mxn * 100.0
+    else:
+        df["pct_umbral_aviso"] = 0.0
 
     # Efectivo alto (>= 75% umbral efectivo)
-    df["efectivo_alto"] = np.where(
-        (df["EsEfectivo"] == 1) & (efectivo_mxn > 0),
-        (df["monto"] >= 0.75 * efectivo_mxn).astype(int),
-        0,
-    )
+    if efectivo_mxn > 0:
+        df["efectivo_alto"] = (
+            (df["EsEfectivo"].to_numpy() == 1) & (df["monto"] >= 0.75 * efectivo_mxn).to_numpy()
+        ).astype(np.int8)
+    else:
+        df["efectivo_alto"] = np.zeros(len(df), dtype=np.int8)
+    return df
+
+
 # ---------------------------------------------------------------------------
 # Compatibility wrapper and helpers expected by enhanced_main_api
 # ---------------------------------------------------------------------------
@@ -276,13 +361,37 @@ def cargar_config_modelos(config_path: Optional[str] = None) -> Dict[str, Any]:
         p = Path(__file__).resolve().parents[1] / "models" / "config_modelos.json"
     if not p.exists():
         raise FileNotFoundError(f"No se encontró config_modelos: {p}")
-    import json
-    with p.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    return _leer_json_cacheado(p)
+
 
+_FRACCIONES_DISPLAY_FILE = Path(__file__).resolve().parents[1] / "models" / "fracciones_display.json"
 
-# Minimal sector map placeholder; the function below uses it to keep compatibility.
-SECTOR_TO_FRACCION_MAP_WRAPPER = {}
+
+@lru_cache(maxsize=1)
+def _sector_map() -> Mapping[str, str]:
+    """
+    Etiqueta amigable -> fracción, leído una sola vez de fracciones_display.json
+    (si existe). Se devuelve de sólo lectura para que nadie lo mute.
+    """
+    mapa: Dict[str, str] = {}
+    try:
+        if _FRACCIONES_DISPLAY_FILE.exists():
+            data = json.loads(_FRACCIONES_DISPLAY_FILE.read_text(encoding="utf-8"))
+            mappings = data.get("mappings", {}) if isinstance(data, dict) else {}
+            for display, meta in mappings.items():
+                fr = meta.get("fraccion")
+                if fr:
+                    # map lower-case and underscore variants
+                    mapa[display.lower()] = fr
+                    mapa[display.lower().replace(" ", "_")] = fr
+                    mapa[fr.lower()] = fr
+    except Exception:
+        pass
+    return MappingProxyType(mapa)
+
+
+# Quita acentos en una sola pasada (str.translate)
+_ACENTOS_TABLE = str.maketrans("áéíóúüñ", "aeiouun")
 
 
 def normalizar_sector(sector_raw: Any) -> str:
@@ -290,53 +399,33 @@ def normalizar_sector(sector_raw: Any) -> str:
     if _pd.isna(sector_raw) or sector_raw is None:
         return "servicios_generales"
 
-    sector_clean = str(sector_raw).lower().strip()
-    acentos = {"á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ü": "u", "ñ": "n"}
-    for a, s in acentos.items():
-        sector_clean = sector_clean.replace(a, s)
+    sector_clean = str(sector_raw).lower().strip().translate(_ACENTOS_TABLE)
 
     if not sector_clean or sector_clean in ("nan", "none", "null", ""):
         return "servicios_generales"
 
-    if sector_clean in SECTOR_TO_FRACCION_MAP_WRAPPER:
-        return SECTOR_TO_FRACCION_MAP_WRAPPER[sector_clean]
+    sector_map = _sector_map()
+    if sector_clean in sector_map:
+        return sector_map[sector_clean]
 
     sector_underscore = sector_clean.replace(" ", "_").replace("-", "_")
-    if sector_underscore in SECTOR_TO_FRACCION_MAP_WRAPPER:
-        return SECTOR_TO_FRACCION_MAP_WRAPPER[sector_underscore]
+    if sector_underscore in sector_map:
+        return sector_map[sector_underscore]
 
-    for keyword, fraccion in SECTOR_TO_FRACCION_MAP_WRAPPER.items():
+    for keyword, fraccion in sector_map.items():
         if keyword in sector_clean or sector_clean in keyword:
             return fraccion
 
     return "servicios_generales"
 
 
-# Load friendly->fraccion map from models/fracciones_display.json if present
-try:
-    _fracciones_file = Path(__file__).resolve().parents[1] / "models" / "fracciones_display.json"
-    if _fracciones_file.exists():
-        import json as _json
-        data = _json.loads(_fracciones_file.read_text(encoding='utf-8'))
-        mappings = data.get("mappings", {}) if isinstance(data, dict) else {}
-        for display, meta in mappings.items():
-            fr = meta.get("fraccion")
-            if fr:
-                # map lower-case and underscore variants
-                SECTOR_TO_FRACCION_MAP_WRAPPER[display.lower()] = fr
-                SECTOR_TO_FRACCION_MAP_WRAPPER[display.lower().replace(' ', '_')] = fr
-                SECTOR_TO_FRACCION_MAP_WRAPPER[fr.lower()] = fr
-except Exception:
-    pass
-
-
 def enriquecer_art17_df(df: pd.DataFrame, cfg: Dict[str, Any], fraccion_lfpiorpi: str) -> pd.DataFrame:
     # Reuse existing `enriquecer_art17` implementation in this module
     try:
-        return enriquecer_art17(df.copy(), cfg, fraccion_lfpiorpi)
+        return enriquecer_art17(df, cfg, fraccion_lfpiorpi)
     except Exception:
         # As a safe fallback, compute minimal enrichment
-        df = df.copy()
+        df = df.copy(deep=False)
         uma = float(cfg.get("lfpiorpi", {}).get("uma_mxn", 113.14))
         df["monto_umas"] = df.get("monto", 0) / uma
         df["monto_6m"] = df.get("monto", 0)
@@ -364,7 +453,42 @@ def enrich_features(
     if fraccion_lfpiorpi is None:
         fraccion_lfpiorpi = cfg.get("lfpiorpi_default", {}).get("fraccion_por_defecto", "V_inmuebles")
 
-    return enriquecer_art17_df(df.copy(), cfg, fraccion_lfpiorpi)
+    return enriquecer_art17_df(df, cfg, fraccion_lfpiorpi)
+
+
+def leer_csv(input_path: Path) -> pd.DataFrame:
+    """
+    Lee el CSV de entrada con el parser de pyarrow si está disponible (si no,
+    o si falla, con el de pandas) y deja fecha como datetime en una sola
+    pasada: Arrow ya infiere las fechas ISO, así que sólo se convierte si
+    llegó como texto.
+    """
+    df = None
+    if pyarrow is not None:
+        try:
+            df = pd.read_csv(input_path, engine="pyarrow")
+        except Exception:
+            df = None
+    if df is None:
+        df = pd.read_csv(input_path)
+    if "fecha" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["fecha"]):
+        df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
+    return df
+
+
+def guardar_enriquecido(df: pd.DataFrame, out_path: Path, output_format: str = "csv") -> Path:
+    """
+    Guarda el DataFrame enriquecido y devuelve la ruta escrita.
+    - "csv": df.to_csv (formato de fechas y comillas que espera ml_runner).
+    - "parquet": Parquet (zstd) con el mismo nombre base; sin pyarrow, CSV.
+    """
+    if output_format == "parquet" and pyarrow is not None:
+        out_path = Path(out_path).with_suffix(".parquet")
+        df.to_parquet(out_path, engine="pyarrow", compression="zstd", compression_level=3, index=False)
+        return out_path
+
+    df.to_csv(out_path, index=False)
+    return out_path
 
 
 def enriquecer_art17_file(
@@ -373,9 +497,10 @@ def enriquecer_art17_file(
     fraccion_lfpiorpi: str,
     training_mode: bool,
     analysis_id: Optional[str] = None,
+    output_format: str = "csv",
 ) -> str:
     input_path = Path(input_path)
-    df = pd.read_csv(input_path)
+    df = leer_csv(input_path)
     # If fraccion_lfpiorpi seems missing or malformed, fallback to normalizar_sector
     if not fraccion_lfpiorpi:
         fraccion_lfpiorpi = normalizar_sector(df.get('sector_actividad', None))
@@ -390,7 +515,7 @@ def enriquecer_art17_file(
     else:
         out_path = mode_dir / f"enriched_{input_path.name}"
 
-    df_enriched.to_csv(out_path, index=False)
+    out_path = guardar_enriquecido(df_enriched, out_path, output_format)
     return str(out_path)
 
 
@@ -400,6 +525,7 @@ def procesar_archivo(
     config_path: Optional[str] = None,
     training_mode: bool = False,
     analysis_id: Optional[str] = None,
+    output_format: str = "csv",
 ) -> Union[str, tuple]:
     cfg = cargar_config_modelos(config_path)
 
@@ -415,6 +541,7 @@ def procesar_archivo(
             fraccion_lfpiorpi=fraccion,
             training_mode=training_mode,
             analysis_id=analysis_id,
+            output_format=output_format,
         )
         return out_path
     except Exception as e:
@@ -423,6 +550,71 @@ def procesar_archivo(
     return True, f"Archivo enriquecido guardado en {output_path}"
 
 
+# Config del proceso worker: se recibe una vez vía initializer del pool
+_CFG_WORKER: Optional[Dict[str, Any]] = None
+
+
+def _init_worker(cfg: Dict[str, Any]) -> None:
+    global _CFG_WORKER
+    _CFG_WORKER = cfg
+
+
+def _enriquecer_en_worker(
+    input_path: str,
+    fraccion: str,
+    training_mode: bool,
+    output_format: str,
+) -> Union[str, tuple]:
+    try:
+        return enriquecer_art17_file(
+            input_path=input_path,
+            cfg=_CFG_WORKER,
+            fraccion_lfpiorpi=fraccion,
+            training_mode=training_mode,
+            output_format=output_format,
+        )
+    except Exception as e:
+        return (False, f"Error en procesar_archivo: {e}")
+
+
+def procesar_varios_archivos(
+    input_paths: Sequence[str],
+    sector_actividad: str = "use_file",
+    config_path: Optional[str] = None,
+    training_mode: bool = False,
+    n_jobs: Optional[int] = None,
+    output_format: str = "csv",
+) -> List[Union[str, tuple]]:
+    """
+    Enriquece varios archivos independientes en paralelo (hasta n_jobs
+    procesos; por defecto os.cpu_count()). El config se carga una vez en el
+    proceso padre y se pasa a cada worker con el initializer del pool.
+
+    Devuelve, en el mismo orden, lo mismo que procesar_archivo por archivo:
+    la ruta enriquecida o (False, mensaje).
+    """
+    cfg = cargar_config_modelos(config_path)
+
+    if sector_actividad not in (None, "", "use_file"):
+        fraccion = normalizar_sector(sector_actividad)
+    else:
+        fraccion = cfg.get("lfpiorpi_default", {}).get("fraccion_por_defecto", "V_inmuebles")
+
+    enriquecer = partial(
+        _enriquecer_en_worker,
+        fraccion=fraccion,
+        training_mode=training_mode,
+        output_format=output_format,
+    )
+    paths = [str(p) for p in input_paths]
+    max_workers = min(n_jobs or os.cpu_count() or 1, len(paths))
+    if max_workers <= 1:
+        _init_worker(cfg)
+        return [enriquecer(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(cfg,)) as ex:
+        return list(ex.map(enriquecer, paths))
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Validador/Enriquecedor v5 para actividades vulnerables (Art.17)"